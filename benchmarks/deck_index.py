@@ -0,0 +1,70 @@
+"""
+Measures the Card lookups of a Deck served by the DeckIndex compared with a
+scan over all Cards, as they were done before the index existed.
+
+    python benchmarks/deck_index.py --cards 100000
+"""
+import argparse
+from datetime import datetime, timezone
+from itertools import chain
+import timeit
+
+from deck_cli.deck.simplified import CardState, Deck, DeckIndex
+from deck_cli.deck.simplified import UserWithCards
+
+import synthetic
+
+
+def scan_cards(deck: Deck):
+    """All Cards by iterating over the Boards and Stacks."""
+    return list(chain.from_iterable(
+        x.cards for board in deck.boards for x in board.stacks))
+
+
+def scan_overdue(deck: Deck):
+    """The overdue Cards by checking every Card."""
+    now = datetime.now(tz=timezone.utc)
+    return [x for x in scan_cards(deck) if x.duedate is not None
+            and x.duedate < now and x.state != CardState.DONE]
+
+
+def scan_user(deck: Deck, username: str):
+    """The Cards of a User by checking every Card."""
+    return [x for x in scan_cards(deck)
+            if any(y.username == username for y in x.assigned_users)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    deck = Deck.from_boards(synthetic.boards(20, args.cards, 500))
+    build = min(timeit.repeat(
+        lambda: DeckIndex(deck.boards), number=1, repeat=args.repeat))
+    print("{} cards, DeckIndex build (once) {:8.1f} ms".format(
+        args.cards, build * 1000))
+
+    cases = [
+        ("cards", lambda: scan_cards(deck), deck.cards),
+        ("overdue_cards", lambda: scan_overdue(deck), deck.overdue_cards),
+        ("user_cards", lambda: scan_user(deck, "user1"),
+         lambda: deck.user_cards("user1")),
+    ]
+    print("{:<24} {:>10} {:>10}".format("", "scan", "index"))
+    for name, before, after in cases:
+        if before() != after():
+            raise SystemExit("{} differs".format(name))
+        slow = min(timeit.repeat(before, number=1, repeat=args.repeat))
+        fast = min(timeit.repeat(after, number=1, repeat=args.repeat))
+        print("{:<24} {:>7.1f} ms {:>7.1f} ms".format(
+            name, slow * 1000, fast * 1000))
+    users = min(timeit.repeat(
+        lambda: UserWithCards.from_deck(deck), number=1, repeat=args.repeat))
+    print("{:<24} {:>10} {:>7.1f} ms".format(
+        "UserWithCards.from_deck", "", users * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Compares the fast decoders with the marshmallow schemas on a synthetic
+Stacks response. Both have to produce equal objects.
+
+    python benchmarks/decode.py --cards 50000
+"""
+import argparse
+import time
+
+from deck_cli.deck import decode
+from deck_cli.deck.models import NCDeckStack
+
+import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cards", type=int, default=50000)
+    args = parser.parse_args()
+
+    raw = synthetic.stacks_json(args.cards)
+    print("{} cards, {:.1f} MB JSON".format(args.cards, len(raw) / 1e6))
+
+    start = time.perf_counter()
+    slow = NCDeckStack.from_json(raw, True)
+    schema = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = decode.stacks_from_json(raw)
+    fast_time = time.perf_counter() - start
+
+    if slow != fast:
+        raise SystemExit("decoded Stacks differ")
+    print("marshmallow schemas  {:8.2f} s".format(schema))
+    print("fast decoders        {:8.2f} s".format(fast_time))
+
+
+if __name__ == "__main__":
+    main()
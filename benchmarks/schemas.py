@@ -0,0 +1,63 @@
+"""
+Measures the cost of one (de-)serialization with the schemas of the
+registry compared with building the schema for every call, as it was done
+before the registry existed.
+
+    python benchmarks/schemas.py --repeat 200
+"""
+import argparse
+import datetime
+import json
+import timeit
+
+from deck_cli.deck.models import NCBoard, NCCardPost, NCDeckCard, NCDeckStack
+from deck_cli.deck.models import decode_response
+from deck_cli.deck.schema import schema_for
+
+import marshmallow_dataclass
+
+from synthetic import payloads
+
+
+def rebuilt(cls: type):
+    """Returns a new schema for the data class, bypassing the registry."""
+    return marshmallow_dataclass.class_schema(cls)()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    card = json.dumps(payloads.card(1, 10, 1))
+    stack = json.dumps(payloads.stacks(1, 0)[:1])
+    boards = payloads.boards_json(3)
+    post = NCCardPost(
+        title="Card", description="Text",
+        duedate=datetime.datetime(2021, 1, 31, 12))
+
+    cases = [
+        ("NCDeckCard.from_json (single card)",
+         lambda: rebuilt(NCDeckCard).load(decode_response(card)),
+         lambda: NCDeckCard.from_json(card, False)),
+        ("NCDeckStack.from_json (empty stack)",
+         lambda: rebuilt(NCDeckStack).load(decode_response(stack), many=True),
+         lambda: NCDeckStack.from_json(stack, True)),
+        ("NCBoard.from_json (3 boards)",
+         lambda: rebuilt(NCBoard).load(decode_response(boards), many=True),
+         lambda: NCBoard.from_json(boards, True)),
+        ("NCCardPost.dumps",
+         lambda: rebuilt(NCCardPost).dumps(post),
+         lambda: schema_for(NCCardPost).dumps(post)),
+    ]
+    print("{:<38} {:>12} {:>12}".format("per call", "rebuilt", "registry"))
+    for name, before, after in cases:
+        after()
+        slow = timeit.timeit(before, number=args.repeat) / args.repeat
+        fast = timeit.timeit(after, number=args.repeat) / args.repeat
+        print("{:<38} {:>9.3f} ms {:>9.3f} ms".format(
+            name, slow * 1000, fast * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Synthetic data for the benchmarks: simplified Decks of a given size. The
+responses of the Deck API are built with the payloads of the tests.
+"""
+from datetime import datetime, timedelta, timezone
+import os
+import sys
+from typing import List
+
+from deck_cli.deck.simplified import Board, Card, CardState, Stack, User
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tests"))
+import payloads  # noqa: E402
+
+
+def stacks_json(cards: int) -> str:
+    """The Stacks response of a single Board with about the given Cards."""
+    return payloads.stacks_json(1, cards // len(payloads.STACK_TITLES))
+
+
+STATES = [CardState.BACKLOG, CardState.IN_PROGRESS, CardState.DONE]
+
+
+def boards(
+    count: int,
+    cards: int,
+    users: int,
+    users_per_card: int = 2,
+) -> List[Board]:
+    """
+    Simplified Boards with the given number of Cards spread over them. Each
+    Card has the given number of assigned Users (out of users distinct ones)
+    and two out of three Cards have a due date, about half of them overdue.
+    New instances are returned on every call as a Deck takes over the Users
+    of its Cards.
+    """
+    start = datetime.now(tz=timezone.utc) - timedelta(hours=1000)
+    rsl = []
+    for board_id in range(count):
+        name = "Board {}".format(board_id)
+        stacks = []
+        for i, state in enumerate(STATES):
+            stacks.append(Stack(
+                identifier=board_id * len(STATES) + i,
+                name=state.name.title(),
+                cards=[Card(
+                    identifier=x,
+                    name="Card {}".format(x),
+                    description="",
+                    labels=["label-{}".format(x % 5)],
+                    assigned_users=[User(
+                        username="user{}".format((x + y) % users),
+                        full_name="User {}".format((x + y) % users))
+                        for y in range(users_per_card)],
+                    duedate=None if x % 3 == 0 else
+                    start + timedelta(hours=x % 2000),
+                    state=state,
+                    archived=False,
+                    board_name=name,
+                    stack_name=state.name.title(),
+                ) for x in range(board_id + i * count, cards,
+                                 count * len(STATES))],
+            ))
+        rsl.append(Board(identifier=board_id, name=name, stacks=stacks))
+    return rsl
@@ -0,0 +1,64 @@
+"""
+Measures collecting the assigned Users of a Deck with Deck.from_boards
+compared with the former approach, which concatenated the lists of all
+Cards, Stacks and Boards and removed the duplicates with a set.
+
+    python benchmarks/users.py
+"""
+import argparse
+import time
+from typing import List
+
+from deck_cli.deck.simplified import Board, Deck, User
+
+import synthetic
+
+SIZES = [(10000, 500), (100000, 500), (100000, 50000)]
+
+
+def former_users(boards: List[Board]) -> List[User]:
+    """The Users of the Boards as they were collected before."""
+    users: List[User] = []
+    for board in boards:
+        board_users: List[User] = []
+        for stack in board.stacks:
+            stack_users: List[User] = []
+            for card in stack.cards:
+                stack_users = stack_users + card.assigned_users
+            board_users = board_users + list(set(stack_users))
+        users = users + list(set(board_users))
+    return list(set(users))
+
+
+def best_of(repeat: int, func, *args) -> float:
+    """Returns the fastest of the given number of runs in seconds."""
+    rsl = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        rsl.append(time.perf_counter() - start)
+    return min(rsl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--boards", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{} Boards, 2 Users per Card".format(args.boards))
+    print("{:<26} {:>10} {:>10}".format("", "former", "from_boards"))
+    for cards, users in SIZES:
+        boards = synthetic.boards(args.boards, cards, users)
+        collected = Deck.from_boards(boards).users
+        if set(collected) != set(former_users(boards)):
+            raise SystemExit("collected Users differ")
+        before = best_of(args.repeat, former_users, boards)
+        after = best_of(args.repeat, Deck.from_boards, boards)
+        print("{:<26} {:>9.3f}s {:>9.3f}s".format(
+            "{}k Cards / {} Users".format(cards // 1000, users),
+            before, after))
+
+
+if __name__ == "__main__":
+    main()
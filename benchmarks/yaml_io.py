@@ -0,0 +1,56 @@
+"""
+Measures loading and writing a YAML dump with the loaders and dumpers of
+PyYAML. The LibYAML ones (CSafeLoader, CSafeDumper) are only measured if
+PyYAML was built with LibYAML.
+
+    python benchmarks/yaml_io.py --cards 20000
+"""
+import argparse
+import time
+
+from deck_cli.deck.schema import schema_for
+from deck_cli.deck.simplified import Deck
+
+import yaml
+
+import synthetic
+
+
+def timed(func, *args):
+    """Returns the result of the call and its duration in seconds."""
+    start = time.perf_counter()
+    rsl = func(*args)
+    return rsl, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cards", type=int, default=20000)
+    args = parser.parse_args()
+
+    deck = Deck.from_boards(synthetic.boards(20, args.cards, 500))
+    data = schema_for(Deck).dump(deck)
+
+    dumpers = [yaml.Dumper, yaml.SafeDumper]
+    loaders = [yaml.FullLoader, yaml.SafeLoader]
+    if yaml.__with_libyaml__:
+        dumpers.append(yaml.CSafeDumper)
+        loaders.append(yaml.CSafeLoader)
+
+    raw = None
+    for dumper in dumpers:
+        rsl, duration = timed(yaml.dump, data, None, dumper)
+        if raw is not None and rsl != raw:
+            raise SystemExit("{} differs".format(dumper.__name__))
+        raw = rsl
+        print("dump {:<12} {:8.2f} s".format(dumper.__name__, duration))
+    print("{} cards, {:.1f} MB YAML".format(args.cards, len(raw) / 1e6))
+    for loader in loaders:
+        rsl, duration = timed(yaml.load, raw, loader)
+        if rsl != data:
+            raise SystemExit("{} differs".format(loader.__name__))
+        print("load {:<12} {:8.2f} s".format(loader.__name__, duration))
+
+
+if __name__ == "__main__":
+    main()
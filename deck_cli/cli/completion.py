@@ -0,0 +1,202 @@
+"""
+Completion of the names of Boards, Stacks and Users in the interactive
+prompts. A CompletionIndex is built once for a list of names. Thus the
+completions for an input are found without matching the input against all
+names on every keystroke:
+
+- Names starting with the input (or containing a word starting with it) are
+  looked up in a prefix index for inputs of up to two characters.
+- Longer inputs are looked up in a trigram index, only names containing all
+  trigrams of the input are checked for the input as a substring.
+- If this yields too few results, names containing the characters of the
+  input in the same order (fuzzy matches) are added. Only names containing
+  all of these characters are checked.
+
+The names containing the input come before the fuzzy matches. Within these
+groups the results are ranked by recent use first, then by the kind of the
+match (prefix, word prefix, substring), the position of the match and the
+length of the name.
+"""
+import heapq
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from prompt_toolkit.completion import Completion
+from prompt_toolkit.document import Document
+
+MAX_COMPLETIONS = 50
+"""Maximal number of completions offered for an input."""
+
+_PREFIX_LENGTH = 2
+_WORD = re.compile(r"[^\W_]+")
+_PREFIX_MATCH = 0
+_WORD_MATCH = 1
+_SUBSTRING_MATCH = 2
+_FUZZY_MATCH = 3
+
+Rank = Tuple[bool, int, int, int, int, int]
+
+
+class RecentNames:
+    """The names used most recently, the most recent first."""
+    names: List[str]
+    size: int
+    changed: bool
+    __ranks: Dict[str, int]
+
+    def __init__(self, names: Optional[List[str]] = None, size: int = 20):
+        self.names = list(names or [])[:size]
+        self.size = size
+        self.changed = False
+        self.__ranks = {x: i for i, x in enumerate(self.names)}
+
+    def use(self, name: str):
+        """Marks the given name as used right now."""
+        if name in self.__ranks:
+            self.names.remove(name)
+        self.names.insert(0, name)
+        del self.names[self.size:]
+        self.__ranks = {x: i for i, x in enumerate(self.names)}
+        self.changed = True
+
+    def rank(self, name: str) -> int:
+        """Returns the rank of a name, names not used recently come last."""
+        return self.__ranks.get(name, self.size)
+
+
+class CompletionIndex:
+    """
+    Index over a list of names for completion and validation. The index
+    doesn't change, build a new one if the names change.
+    """
+    names: List[str]
+    __lowered: List[str]
+    __known: Set[str]
+    __prefixes: Dict[str, Set[int]]
+    __trigrams: Dict[str, Set[int]]
+    __chars: Dict[str, Set[int]]
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.__lowered = [x.lower() for x in names]
+        self.__known = set(names)
+        self.__prefixes = {}
+        self.__trigrams = {}
+        self.__chars = {}
+        for i, name in enumerate(self.__lowered):
+            prefixes = {name[:x] for x in range(1, _PREFIX_LENGTH + 1)}
+            for word in _WORD.findall(name):
+                prefixes.update(
+                    word[:x] for x in range(1, _PREFIX_LENGTH + 1))
+            for prefix in prefixes:
+                self.__prefixes.setdefault(prefix, set()).add(i)
+            for trigram in _trigrams(name):
+                self.__trigrams.setdefault(trigram, set()).add(i)
+            for char in set(name):
+                self.__chars.setdefault(char, set()).add(i)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__known
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def complete(
+        self,
+        text: str,
+        recent: Optional[RecentNames] = None,
+        limit: int = MAX_COMPLETIONS,
+    ) -> List[str]:
+        """Returns the best matching names for the given input."""
+        query = text.strip().lower()
+        if query == "":
+            return self.__initial(recent, limit)
+        ranks: Dict[int, Rank] = {}
+        for i in self.__direct_candidates(query):
+            rank = self.__rank(i, query, recent, False)
+            if rank is not None:
+                ranks[i] = rank
+        if len(ranks) < limit:
+            fuzzy = _intersect([self.__chars.get(x) for x in set(query)])
+            pattern = re.compile(".*?".join(re.escape(x) for x in query))
+            for i in fuzzy:
+                if i in ranks or pattern.search(self.__lowered[i]) is None:
+                    continue
+                ranks[i] = self.__rank(i, query, recent, True)
+        best = heapq.nsmallest(limit, ranks, key=ranks.__getitem__)
+        return [self.names[x] for x in best]
+
+    def completions(
+        self,
+        document: Document,
+        recent: Optional[RecentNames] = None,
+    ) -> Iterator[Completion]:
+        """Yields the completions for a prompt, replacing the whole input."""
+        text = document.text_before_cursor
+        for name in self.complete(text, recent):
+            yield Completion(name, start_position=-len(text))
+
+    def __initial(
+        self,
+        recent: Optional[RecentNames],
+        limit: int,
+    ) -> List[str]:
+        """Returns the names offered for an empty input."""
+        rsl: List[str] = []
+        if recent is not None:
+            rsl = [x for x in recent.names if x in self.__known][:limit]
+        used = set(rsl)
+        for name in self.names:
+            if len(rsl) >= limit:
+                break
+            if name not in used:
+                rsl.append(name)
+                used.add(name)
+        return rsl
+
+    def __direct_candidates(self, query: str) -> Set[int]:
+        """
+        Returns the names which possibly start with or contain the query.
+        """
+        if len(query) <= _PREFIX_LENGTH:
+            return self.__prefixes.get(query, set())
+        return _intersect([self.__trigrams.get(x) for x in _trigrams(query)])
+
+    def __rank(
+        self,
+        i: int,
+        query: str,
+        recent: Optional[RecentNames],
+        fuzzy: bool,
+    ) -> Optional[Rank]:
+        """
+        Returns the rank of the name at position i (lower is better). None if
+        the name doesn't contain the query (unless fuzzy is set).
+        """
+        name = self.__lowered[i]
+        position = name.find(query)
+        if position == 0:
+            kind = _PREFIX_MATCH
+        elif position > 0:
+            kind = _SUBSTRING_MATCH
+            if not name[position - 1].isalnum():
+                kind = _WORD_MATCH
+        elif fuzzy:
+            kind, position = _FUZZY_MATCH, 0
+        else:
+            return None
+        recency = recent.rank(self.names[i]) if recent is not None else 0
+        return (kind == _FUZZY_MATCH, recency, kind, position, len(name), i)
+
+
+def _trigrams(value: str) -> Set[str]:
+    """Returns all trigrams of a string."""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _intersect(postings: List[Optional[Set[int]]]) -> Set[int]:
+    """Returns the positions contained in all of the given posting sets."""
+    if len(postings) == 0 or any(x is None for x in postings):
+        return set()
+    postings = sorted(postings, key=len)
+    return postings[0].intersection(*postings[1:])
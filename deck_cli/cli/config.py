@@ -2,11 +2,14 @@
 Module handles all the configuration stuff.
 """
 from dataclasses import dataclass, field
-from typing import List, ClassVar, Type
+from typing import List, ClassVar, Optional, Type
+
+from deck_cli.cli.metadata import MetadataCache
+from deck_cli.cli.yaml_io import dump_yaml, load_yaml
+from deck_cli.deck.cache import ResponseCache
+from deck_cli.deck.schema import schema_for
 
 from marshmallow import Schema
-import marshmallow_dataclass
-import yaml
 
 
 @dataclass
@@ -59,14 +62,50 @@ class Config:
             default="Europe/Berlin",
         )
     )
+    workers: int = field(
+        default=1,
+        metadata=dict(
+            description="Number of parallel requests when fetching Stacks")
+    )
+    async_fetch: bool = field(
+        default=False,
+        metadata=dict(
+            description="Use the asyncio based API client")
+    )
+    http_cache_path: Optional[str] = field(
+        default=None,
+        metadata=dict(
+            description="Directory for caching API responses, none to disable")
+    )
+    http_cache_size: int = field(
+        default=50,
+        metadata=dict(
+            description="Maximal size of the API response cache in MB")
+    )
+    fast_decode: bool = field(
+        default=False,
+        metadata=dict(
+            description="Read the Stacks without validating them")
+    )
+    metadata_cache_path: Optional[str] = field(
+        default=None,
+        metadata=dict(
+            description="File for caching the Boards, Stacks and Users used "
+                        "by the add command, none to disable")
+    )
+    metadata_cache_ttl: int = field(
+        default=60,
+        metadata=dict(
+            description="Minutes after which the cached Boards, Stacks and "
+                        "Users are refreshed in the background")
+    )
     Schema: ClassVar[Type[Schema]] = Schema
 
     @classmethod
     def from_yaml(cls, raw: str) -> 'Config':
         """Loads the configuration from a given YAML string."""
-        schema = marshmallow_dataclass.class_schema(Config)()
-        data = yaml.load(raw, Loader=yaml.FullLoader)
-        return schema.load(data)
+        data = load_yaml(raw)
+        return schema_for(Config).load(data)
 
     @classmethod
     def defaults(cls) -> 'Config':
@@ -81,10 +120,34 @@ class Config:
             done_stacks=["Done"],
             # mail_cache_path="check-cache.yaml",
             timezone="Europe/Berlin",
+            workers=1,
+            async_fetch=False,
+            http_cache_path=None,
+            http_cache_size=50,
+            fast_decode=False,
+            metadata_cache_path=None,
+            metadata_cache_ttl=60,
+        )
+
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Returns the API response cache if enabled."""
+        if self.http_cache_path is None:
+            return None
+        return ResponseCache(
+            self.http_cache_path,
+            max_size=self.http_cache_size * 1024 * 1024,
+        )
+
+    def metadata_cache(self) -> Optional[MetadataCache]:
+        """Returns the cache for the interactive metadata if enabled."""
+        if self.metadata_cache_path is None:
+            return None
+        return MetadataCache(
+            self.metadata_cache_path,
+            ttl=self.metadata_cache_ttl * 60,
         )
 
     def to_yaml(self) -> str:
         """Returns the config data-class as a YAML string."""
-        schema = marshmallow_dataclass.class_schema(Config)()
-        cfg = schema.dump(self)
-        return yaml.dump(cfg)
+        cfg = schema_for(Config).dump(self)
+        return dump_yaml(cfg)
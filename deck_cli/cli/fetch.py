@@ -1,47 +1,248 @@
 """
 Fetch API results and save them locally for further processing later.
 """
+import asyncio
+import io
+import mmap
+import os
 
 from deck_cli.cli.config import Config
-from deck_cli.deck.fetch import Fetch, ProgressCallback
-from deck_cli.deck.simplified import Deck
+from deck_cli.cli.yaml_io import dump_yaml, load_yaml
+from deck_cli.deck.fetch import AsyncFetch, Fetch, ProgressCallback
+from deck_cli.deck.models import NCBoard
+from deck_cli.deck.schema import schema_for
+from deck_cli.deck.simplified import Board, Deck, User
+from deck_cli.deck.snapshot import MAGIC, SnapshotDeck, SnapshotException
+from deck_cli.deck.snapshot import SnapshotWriter
+from deck_cli.deck.snapshot import is_snapshot
+
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
 
 import click
-import marshmallow_dataclass
-import yaml
 
 
-def deck_to_file(
+def fetch_deck(
+    cfg: Config,
+    on_progress: ProgressCallback,
+    previous: Optional[Deck] = None,
+) -> Deck:
+    """
+    Fetches the current Deck (all Boards visible to the User) from the API.
+    Uses the asynchronous client if enabled in the config.
+
+    If a previous Deck is given, only the Stacks of Boards which changed since
+    then are fetched. The unchanged Boards are taken from the previous Deck.
+    """
+    boards: List[Board] = []
+    fetch_boards(cfg, on_progress, boards.append, previous)
+    return Deck.from_boards(boards)
+
+
+def fetch_boards(
     cfg: Config,
-    path: click.File,
-    on_progress: ProgressCallback
+    on_progress: ProgressCallback,
+    on_board: Callable[[Board], None],
+    previous: Optional[Deck] = None,
 ):
     """
-    Fetch the current Deck (all Boards visible to the User) and writes them
-    as a YAML file to the given path.
+    Fetches the Boards one after another and passes each of them (including
+    its Stacks) to on_board as soon as it's complete. Boards are handed over
+    in the order of the API. Only a few Boards are held in memory at a time,
+    the Stacks of a fetched Board are dropped once it's converted. The
+    caller decides whether to keep the converted Boards.
     """
-    deck = Fetch(
+    if cfg.async_fetch:
+        asyncio.run(_async_fetch_boards(cfg, on_progress, on_board, previous))
+        return
+    with Fetch(
         cfg.url,
         cfg.user,
         cfg.password,
-        progress_callback=on_progress
-    )
-    deck = Deck.from_nc_boards(
-        deck.all_boards_with_stacks(),
+        progress_callback=on_progress,
+        workers=cfg.workers,
+        cache=cfg.response_cache(),
+        fast_decode=cfg.fast_decode,
+    ) as fetch:
+        boards = fetch.all_boards()
+        outdated = _outdated_boards(boards, previous)
+        fetched = fetch.iter_boards_with_stacks(outdated)
+        updated = {x.board_id for x in outdated}
+        known = _known_boards(previous)
+        for board in boards:
+            if board.board_id in updated:
+                on_board(_release_board(cfg, next(fetched)))
+            else:
+                on_board(known[board.board_id])
+
+
+async def _async_fetch_boards(
+    cfg: Config,
+    on_progress: ProgressCallback,
+    on_board: Callable[[Board], None],
+    previous: Optional[Deck],
+):
+    """Same as fetch_boards but uses the AsyncFetch client."""
+    async with AsyncFetch(
+        cfg.url,
+        cfg.user,
+        cfg.password,
+        progress_callback=on_progress,
+        concurrency=cfg.workers,
+        cache=cfg.response_cache(),
+        fast_decode=cfg.fast_decode,
+    ) as fetch:
+        boards = await fetch.all_boards()
+        outdated = _outdated_boards(boards, previous)
+        fetched = fetch.iter_boards_with_stacks(outdated)
+        updated = {x.board_id for x in outdated}
+        known = _known_boards(previous)
+        for board in boards:
+            if board.board_id in updated:
+                on_board(_release_board(cfg, await fetched.__anext__()))
+            else:
+                on_board(known[board.board_id])
+
+
+def _simplify_board(cfg: Config, board: NCBoard) -> Board:
+    """Converts a fetched Board using the Stack mapping of the config."""
+    return Board.from_nc_board(
+        board,
         cfg.backlog_stacks,
         cfg.progress_stacks,
         cfg.done_stacks
     )
-    schema = marshmallow_dataclass.class_schema(Deck)()
-    data = schema.dump(deck)
-    path.write(yaml.dump(data))
 
 
-def load_deck_from_file(path: click.File):
+def _release_board(cfg: Config, board: NCBoard) -> Board:
+    """
+    Converts a fetched Board and drops its Stacks afterwards. The fetched
+    Boards are still listed by the caller, thus without this all Cards of
+    the instance would stay in memory until the end of the dump.
+    """
+    rsl = _simplify_board(cfg, board)
+    board.stacks = []
+    return rsl
+
+
+def _known_boards(previous: Optional[Deck]) -> Dict[int, Board]:
+    """Returns the Boards of the previous Deck by their id."""
+    if previous is None:
+        return {}
+    return {x.identifier: x for x in previous.boards}
+
+
+def _outdated_boards(
+    boards: List[NCBoard],
+    previous: Optional[Deck],
+) -> List[NCBoard]:
+    """
+    Returns the Boards which are not part of the previous Deck or have changed
+    since.
+    """
+    if previous is None:
+        return boards
+    known = _known_boards(previous)
+    return [x for x in boards if x.board_id not in known
+            or known[x.board_id].is_outdated(x)]
+
+
+class YamlDumpWriter:
+    """
+    Writes a Deck as YAML one Board at a time. The output is the same as
+    dumping the whole Deck at once.
+    """
+    __fil: BinaryIO
+    __empty: bool
+
+    def __init__(self, fil: BinaryIO):
+        self.__fil = fil
+        self.__empty = True
+
+    def add_board(self, board: Board):
+        """Appends a Board to the file."""
+        if self.__empty:
+            self.__fil.write(b"boards:\n")
+            self.__empty = False
+        data = schema_for(Board).dump(board)
+        self.__fil.write(dump_yaml([data], encoding="utf-8"))
+
+    def close(self, users: Optional[List[User]] = None):
+        """Writes the Users, has to be called after the last Board."""
+        if self.__empty:
+            self.__fil.write(b"boards: []\n")
+        data = [schema_for(User).dump(x) for x in users or []]
+        self.__fil.write(dump_yaml(dict(users=data), encoding="utf-8"))
+
+
+def deck_to_file(
+    cfg: Config,
+    path: str,
+    on_progress: ProgressCallback,
+    incremental: bool = False,
+    fmt: str = "yaml",
+):
+    """
+    Fetch the current Deck (all Boards visible to the User) and writes them
+    to the file at the given path. The format is either a YAML file or a
+    binary snapshot. When incremental is set, an existing dump at the path is
+    updated by only fetching the changed Boards.
+
+    Each Board is written as soon as it's fetched and released afterwards.
+    The output goes to a temporary file first which replaces the existing
+    dump only after everything was written.
+    """
+    previous: Optional[Deck] = None
+    if incremental and os.path.isfile(path):
+        with open(path, "rb") as fil:
+            previous = load_deck_from_file(fil)
+        if isinstance(previous, SnapshotDeck):
+            snapshot = previous
+            previous = snapshot.deck()
+            snapshot.close()
+
+    tmp_path = "{}.tmp".format(path)
+    users: Dict[str, User] = {}
+
+    def on_board(board: Board):
+        writer.add_board(board)
+        for user in board.assigned_users():
+            users.setdefault(user.username, user)
+
+    try:
+        with open(tmp_path, "wb") as fil:
+            if fmt == "snapshot":
+                writer = SnapshotWriter(fil)
+            else:
+                writer = YamlDumpWriter(fil)
+            fetch_boards(cfg, on_progress, on_board, previous)
+            writer.close(list(users.values()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_deck_from_file(path: click.File) -> Union[Deck, SnapshotDeck]:
     """
-    Loads a dumped Deck (all Boards visible to a given User) from the YAML file
-    with the given path.
+    Loads a dumped Deck (all Boards visible to a given User) from the (binary)
+    file with the given path. The format (YAML or snapshot) is detected
+    automatically. Snapshots are memory-mapped if possible and returned as
+    SnapshotDeck which only decodes the parts of the Deck actually used. A
+    snapshot which can't be read is reported as ClickException.
     """
-    schema = marshmallow_dataclass.class_schema(Deck)()
-    data = yaml.load(path.read(), Loader=yaml.FullLoader)
-    return schema.load(data)
+    head = path.read(len(MAGIC))
+    if not is_snapshot(head):
+        data = load_yaml(head + path.read())
+        return schema_for(Deck).load(data)
+    try:
+        buffer = mmap.mmap(path.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, io.UnsupportedOperation):
+        buffer = head + path.read()
+    try:
+        return SnapshotDeck(buffer)
+    except SnapshotException as err:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+        raise click.ClickException(
+            "cannot read the dump {}: {}".format(path.name, err))
@@ -0,0 +1,448 @@
+"""
+Non-interactive import of Cards from a CSV or YAML file. All rows are
+validated with the rules of the interactive add command and the names of the
+Boards, Stacks and Users are resolved before the first Card is created. The
+Cards are then created by a pool of workers, each worker assigns the Users as
+soon as its Card was created.
+
+The progress is recorded in a journal file. If an import fails partially it
+can be run again with the same journal, Cards which were already created are
+skipped and only missing assignments are retried.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+from dataclasses import dataclass, field
+import datetime
+import io
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+import xml.etree.ElementTree as ET
+
+from deck_cli.cli.config import Config
+from deck_cli.cli.interactive import IDueDate, TitleValidator
+from deck_cli.cli.yaml_io import load_yaml
+from deck_cli.deck.fetch import Fetch, NextcloudException
+from deck_cli.deck.models import DeckException, NCBoard, NCCardPost
+from deck_cli.deck.models import NCDeckStack
+from deck_cli.deck.schema import schema_for
+
+from marshmallow import ValidationError, pre_load
+from prompt_toolkit.document import Document
+from prompt_toolkit.validation import ValidationError as InputError
+import requests
+
+_REQUEST_ERRORS = (DeckException, ValidationError, ValueError,
+                   requests.RequestException)
+"""
+Errors of a single request which only fail the current row: errors reported
+by the API, unexpected responses and connection problems.
+"""
+
+_FETCH_ERRORS = _REQUEST_ERRORS + (NextcloudException, ET.ParseError)
+"""
+Errors while fetching the Boards, Stacks and Users. They abort the import
+before anything was created.
+"""
+
+
+class ImportException(Exception):
+    """Raised when the Cards of an import cannot be resolved or validated."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        Exception.__init__(self, "\n".join(errors))
+
+
+@dataclass
+class ImportCard:
+    """A single Card of an import file."""
+    title: str = field(
+        metadata=dict(
+            description="Title of the Card")
+    )
+    board: str = field(
+        metadata=dict(
+            description="Title of the Board")
+    )
+    stack: Optional[str] = field(
+        default=None,
+        metadata=dict(
+            description="Title of the Stack, none for the first Stack")
+    )
+    description: Optional[str] = field(
+        default=None,
+        metadata=dict(
+            description="Description of the Card")
+    )
+    duedate: Optional[str] = field(
+        default=None,
+        metadata=dict(
+            description="Due date as YYYY-MM-DD HHMM or YYYY-MM-DD")
+    )
+    users: List[str] = field(
+        default_factory=list,
+        metadata=dict(
+            description="Users the Card is assigned to")
+    )
+
+    @pre_load
+    def convert_date(self, data, **kwargs):
+        """YAML reads unquoted dates as date objects."""
+        if isinstance(data, dict) and \
+                isinstance(data.get("duedate"), datetime.date):
+            data["duedate"] = data["duedate"].strftime("%Y-%m-%d")
+        return data
+
+
+@dataclass
+class ImportFile:
+    """The Cards to import."""
+    cards: List[ImportCard] = field(
+        metadata=dict(
+            description="The Cards to import")
+    )
+
+    @classmethod
+    def from_yaml(cls, raw: str) -> 'ImportFile':
+        """Loads the Cards from a given YAML string."""
+        return schema_for(ImportFile).load(load_yaml(raw))
+
+    @classmethod
+    def from_csv(cls, raw: str) -> 'ImportFile':
+        """
+        Loads the Cards from a CSV string. The first line names the columns
+        (title, board, stack, description, duedate and users), multiple Users
+        are separated by commas. Empty optional columns are treated as unset.
+        """
+        rows: List[dict] = []
+        for row in csv.DictReader(io.StringIO(raw)):
+            data = {key: value for key, value in row.items()
+                    if key not in ("stack", "description", "duedate", "users")
+                    or value not in ("", None)}
+            if "users" in data:
+                data["users"] = [x.strip() for x in data["users"].split(",")
+                                 if x.strip() != ""]
+            rows.append(data)
+        return schema_for(ImportFile).load(dict(cards=rows))
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ImportFile':
+        """Loads a CSV or YAML file depending on the file extension."""
+        with open(path, "r", newline="") as fil:
+            raw = fil.read()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            return cls.from_csv(raw)
+        return cls.from_yaml(raw)
+
+
+@dataclass
+class JournalEntry:
+    """
+    The state of an imported row. The row number (starting with 1) and the
+    title identify the row in the import file.
+    """
+    row: int
+    title: str
+    card_id: int
+    board_id: int
+    stack_id: int
+    assigned: List[str] = field(default_factory=list)
+    not_on_board: List[str] = field(default_factory=list)
+
+    class Meta:
+        ordered = True
+
+
+class ImportJournal:
+    """
+    Records the progress of an import. Each change is appended as a JSON line
+    right away, thus the journal stays usable if the import is interrupted.
+    The last line of a row wins.
+    """
+    path: str
+    __entries: Dict[int, JournalEntry]
+    __lock: threading.Lock
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__entries = {}
+        self.__lock = threading.Lock()
+        try:
+            with open(path, "r") as fil:
+                raw = fil.read()
+        except FileNotFoundError:
+            raw = ""
+        if raw != "" and not raw.endswith("\n"):
+            # Terminate the incomplete line of an interrupted import.
+            with open(path, "a") as fil:
+                fil.write("\n")
+        schema = schema_for(JournalEntry)
+        for line in raw.splitlines():
+            try:
+                entry = schema.load(json.loads(line))
+            except (ValueError, ValidationError):
+                continue
+            self.__entries[entry.row] = entry
+
+    def get(self, row: int) -> Optional[JournalEntry]:
+        """Returns the recorded state of a row, None if it's unknown."""
+        return self.__entries.get(row)
+
+    def record(self, entry: JournalEntry):
+        """Appends the current state of a row to the journal."""
+        raw = json.dumps(schema_for(JournalEntry).dump(entry))
+        with self.__lock:
+            self.__entries[entry.row] = entry
+            with open(self.path, "a") as fil:
+                fil.write(raw + "\n")
+
+
+@dataclass
+class ImportTask:
+    """A validated row of the import with the resolved ids."""
+    row: int
+    card: ImportCard
+    board: NCBoard
+    stack: NCDeckStack
+    post: NCCardPost
+
+
+@dataclass
+class RowResult:
+    """
+    The outcome of a row: created, resumed (created by an earlier run, missing
+    assignments were done now), skipped (nothing left to do) or failed.
+    """
+    row: int
+    title: str
+    status: str
+    card_id: Optional[int] = None
+    assigned: List[str] = field(default_factory=list)
+    not_on_board: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        rsl = "row {} ({}): {}".format(self.row, self.title, self.status)
+        if self.card_id is not None:
+            rsl += " card {}".format(self.card_id)
+        if len(self.assigned) > 0:
+            rsl += ", assigned {}".format(", ".join(self.assigned))
+        if len(self.not_on_board) > 0:
+            rsl += ", not part of the Board: {}".format(
+                ", ".join(self.not_on_board))
+        if self.error is not None:
+            rsl += ", {}".format(self.error)
+        return rsl
+
+
+OnResultCallback = Callable[[RowResult], None]
+"""Called with the outcome of each row as soon as it's known."""
+
+
+class Importer:
+    """
+    Imports Cards into the Deck. The Boards, Stacks and Users are fetched
+    once, the rows are validated before anything is created.
+    """
+    config: Config
+    cards: List[ImportCard]
+    journal: ImportJournal
+    __fetch: Fetch
+    __executor: ThreadPoolExecutor
+
+    def __init__(
+        self,
+        config: Config,
+        cards: List[ImportCard],
+        journal: ImportJournal,
+    ):
+        self.config = config
+        self.cards = cards
+        self.journal = journal
+        self.__fetch = Fetch(
+            config.url,
+            config.user,
+            config.password,
+            workers=config.workers,
+        )
+        self.__executor = ThreadPoolExecutor(max_workers=config.workers)
+
+    def prepare(self) -> List[ImportTask]:
+        """
+        Resolves the names of the Boards, Stacks and Users and validates all
+        rows. Raises an ImportException listing all invalid rows.
+        """
+        try:
+            boards = _boards_by_title(self.__fetch.all_boards())
+            needed = {boards[x.board][0].board_id
+                      for x in self.cards if len(boards.get(x.board, [])) == 1}
+            stacks: Dict[int, List[NCDeckStack]] = dict(zip(
+                needed,
+                self.__executor.map(self.__fetch.stacks_by_board, needed),
+            ))
+            users: List[str] = []
+            if any(len(x.users) > 0 for x in self.cards):
+                users = self.__fetch.user_ids()
+        except _FETCH_ERRORS as exc:
+            raise ImportException(["couldn't fetch the Boards, {}".format(
+                _describe(exc))])
+        known_users = set(users)
+        due = IDueDate(self.config.timezone)
+
+        tasks: List[ImportTask] = []
+        errors: List[str] = []
+        for row, card in enumerate(self.cards, start=1):
+            problems: List[str] = []
+            for validator, value in ((TitleValidator(), card.title),
+                                     (due, card.duedate or "")):
+                try:
+                    validator.validate(Document(value))
+                except InputError as exc:
+                    problems.append(exc.message)
+            candidates = boards.get(card.board, [])
+            board = candidates[0] if len(candidates) == 1 else None
+            stack = None
+            if len(candidates) == 0:
+                problems.append("{} is not a valid Board".format(card.board))
+            elif len(candidates) > 1:
+                problems.append("{} names several Boards (ids {})".format(
+                    card.board, ", ".join(str(x.board_id)
+                                          for x in candidates)))
+            else:
+                stack = _stack_by_title(stacks[board.board_id], card.stack)
+                if stack is None:
+                    problems.append("{} is not a valid Stack in {}".format(
+                        card.stack, board.title))
+            for user in card.users:
+                if user not in known_users:
+                    problems.append("{} is not a valid User".format(user))
+            if len(problems) > 0:
+                errors.append("row {} ({}): {}".format(
+                    row, card.title, "; ".join(problems)))
+                continue
+            tasks.append(ImportTask(
+                row=row,
+                card=card,
+                board=board,
+                stack=stack,
+                post=NCCardPost(
+                    title=card.title,
+                    description=card.description,
+                    duedate=due.parse(card.duedate or ""),
+                ),
+            ))
+        if len(errors) > 0:
+            raise ImportException(errors)
+        for task in tasks:
+            entry = self.journal.get(task.row)
+            if entry is not None and entry.title != task.card.title:
+                raise ImportException(["row {} ({}): the journal {} belongs "
+                                       "to another file".format(
+                                           task.row, task.card.title,
+                                           self.journal.path)])
+        return tasks
+
+    def run(
+        self,
+        tasks: List[ImportTask],
+        on_result: OnResultCallback,
+    ) -> List[RowResult]:
+        """
+        Creates the Cards of the given tasks using the pool of workers. The
+        results are reported in the order the rows are finished and returned
+        in the order of the rows.
+        """
+        futures = [self.__executor.submit(self.__import, x) for x in tasks]
+        for future in as_completed(futures):
+            on_result(future.result())
+        return [x.result() for x in futures]
+
+    def close(self):
+        """
+        Cancels the rows which weren't started yet, waits for the running ones
+        (thus the journal is complete) and closes the connections.
+        """
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+        self.__fetch.close()
+
+    def __import(self, task: ImportTask) -> RowResult:
+        """Creates the Card of a row (if needed) and assigns its Users."""
+        entry = self.journal.get(task.row)
+        status = "resumed"
+        if entry is None:
+            status = "created"
+            try:
+                card = self.__fetch.add_card(
+                    task.board.board_id, task.stack.stack_id, task.post)
+            except _REQUEST_ERRORS as exc:
+                return RowResult(task.row, task.card.title, "failed",
+                                 error="couldn't add Card, {}".format(
+                                     _describe(exc)))
+            entry = JournalEntry(
+                row=task.row,
+                title=task.card.title,
+                card_id=card.card_id,
+                board_id=task.board.board_id,
+                stack_id=task.stack.stack_id,
+            )
+            self.journal.record(entry)
+        missing = [x for x in task.card.users
+                   if x not in entry.assigned and x not in entry.not_on_board]
+        if status == "resumed" and len(missing) == 0:
+            status = "skipped"
+        rsl = RowResult(task.row, task.card.title, status, entry.card_id)
+        for user in missing:
+            try:
+                self.__fetch.assign_user_to_card(
+                    entry.board_id, entry.stack_id, entry.card_id, user)
+                entry.assigned.append(user)
+                rsl.assigned.append(user)
+            except _REQUEST_ERRORS as exc:
+                if isinstance(exc, DeckException) and \
+                        exc.user_not_part_of_board:
+                    entry.not_on_board.append(user)
+                    continue
+                rsl.status = "failed"
+                rsl.error = "couldn't assign {}, {}".format(
+                    user, _describe(exc))
+                break
+            finally:
+                self.journal.record(entry)
+        rsl.not_on_board = list(entry.not_on_board)
+        return rsl
+
+
+def _boards_by_title(boards: List[NCBoard]) -> Dict[str, List[NCBoard]]:
+    """
+    Groups the Boards by their title. Titles aren't unique, a row naming
+    more than one Board is rejected instead of picking one of them.
+    """
+    rsl: Dict[str, List[NCBoard]] = {}
+    for board in boards:
+        rsl.setdefault(board.title, []).append(board)
+    return rsl
+
+
+def _stack_by_title(
+    stacks: List[NCDeckStack],
+    title: Optional[str],
+) -> Optional[NCDeckStack]:
+    """
+    Returns the Stack with the given title, the first Stack if no title is
+    given. None if there is no such Stack.
+    """
+    if title is None:
+        return stacks[0] if len(stacks) > 0 else None
+    for stack in stacks:
+        if stack.title == title:
+            return stack
+    return None
+
+
+def _describe(exc: Exception) -> str:
+    """Returns a short description of a request error."""
+    if isinstance(exc, (ValidationError, ValueError)):
+        return "unexpected response from the server"
+    return str(exc)
@@ -1,56 +1,114 @@
 """
 This module handles the interactive CLI interaction with Deck.
 """
+from deck_cli.cli.completion import CompletionIndex, RecentNames
 from deck_cli.cli.config import Config
-from deck_cli.deck.fetch import Fetch, NextcloudException
-from deck_cli.deck.models import NCBoard, NCDeckStack, NCCardPost, NCDeckCard, DeckException
+from deck_cli.cli.metadata import BoardEntry, Metadata, MetadataCache
+from deck_cli.cli.metadata import StackEntry
+from deck_cli.deck.fetch import Fetch, NextcloudException, UserAssignment
+from deck_cli.deck.models import NCCardPost, NCDeckCard, DeckException
 
 from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, tzinfo
 import sys
+import threading
+import time
 import pytz
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from prompt_toolkit import PromptSession, print_formatted_text, HTML
-from prompt_toolkit.completion import Completer, Completion, FuzzyCompleter
+from prompt_toolkit.completion import Completer
 from prompt_toolkit.validation import Validator, ValidationError
 
 
-OnWaitCallback = Callable[[str], ]
+OnWaitCallback = Callable[[str], None]
 """Called when the user has to wait."""
 
 
 class IBoards(Completer, Validator):
     """
     Handles the interactive interaction with Deck Boards. Also handles the
-    caching to prevent unnecessary API calls during the same session.
+    caching to prevent unnecessary API calls during the same session. The
+    Boards are loaded in the background, they are only waited for when
+    needed. Cached Boards can be refreshed in the background. The completion
+    uses an index of the titles and prefers recently selected Boards.
     """
-    boards: List[NCBoard]
+    recent: RecentNames
+    __future: Future
+    __boards: Optional[List[BoardEntry]] = None
+    __index: Optional[CompletionIndex] = None
+    __indexed: Optional[List[BoardEntry]] = None
+    __on_wait: OnWaitCallback
+    __on_error: Callable[[str], None]
 
     def __init__(
             self,
-            fetch: Fetch,
+            future: Future,
+            recent: RecentNames,
             on_wait: OnWaitCallback,
-            on_error: Callable[[str], ]
+            on_error: Callable[[str], None]
     ):
-        on_wait("Fetching Boards from server...")
+        self.recent = recent
+        self.__future = future
+        self.__on_wait = on_wait
+        self.__on_error = on_error
+
+    @property
+    def boards(self) -> List[BoardEntry]:
+        """The Boards, waits for the background request if necessary."""
+        if self.__boards is not None:
+            return self.__boards
+        if not self.__future.done():
+            self.__on_wait("Fetching Boards from server...")
         try:
-            self.boards = fetch.all_boards()
+            self.__boards = self.__future.result()
         except DeckException as exc:
             msg = str(exc)
-            on_error("Couldn't fetch Boards from server, {}".format(
+            self.__on_error("Couldn't fetch Boards from server, {}".format(
                 msg[:1].lower() + msg[1:]
             ))
+            sys.exit(1)
+        return self.__boards
+
+    @property
+    def index(self) -> CompletionIndex:
+        """The index of the Board titles, rebuilt if the Boards changed."""
+        return self.__build_index(self.boards)
 
-    def select(self, session: PromptSession) -> NCBoard:
+    def refresh(self, future: Future):
+        """
+        Replaces the Boards with the result of the given request once it's
+        done. The current Boards are kept if the request fails. The index is
+        built right away.
+        """
+        future.add_done_callback(self.__on_refresh)
+
+    def __on_refresh(self, future: Future):
+        """Takes the Boards of a finished refresh request."""
+        boards = _result(future)
+        if boards is not None:
+            self.__build_index(boards)
+            self.__boards = boards
+
+    def __build_index(self, boards: List[BoardEntry]) -> CompletionIndex:
+        """Returns the index for the given Boards, builds it if necessary."""
+        index = self.__index
+        if self.__indexed is not boards:
+            index = CompletionIndex([x.title for x in boards])
+            self.__index, self.__indexed = index, boards
+        return index
+
+    def select(self, session: PromptSession) -> BoardEntry:
         """
         Queries the available Boards from the API and lets the user choose one.
         """
         selection = session.prompt(
             HTML("<SkyBlue><b>Board,</b> select a Board: </SkyBlue>"),
-            completer=FuzzyCompleter(self),
+            completer=self,
             validator=self,
         )
+        self.recent.use(selection)
         return self.__board_by_input(selection)
 
     def list(self):
@@ -59,8 +117,8 @@ class IBoards(Completer, Validator):
                             for x in self.boards])
         print_formatted_text(HTML(output))
 
-    def __board_by_input(self, text: str) -> NCBoard:
-        """Returns the Board by the input (NCBoard title)."""
+    def __board_by_input(self, text: str) -> BoardEntry:
+        """Returns the Board by the input (Board title)."""
         for board in self.boards:
             if board.title == text:
                 return board
@@ -68,12 +126,11 @@ class IBoards(Completer, Validator):
 
     def get_completions(self, document, complete_event):
         """Implements the interactive completion for Boards."""
-        for board in self.boards:
-            yield Completion(board.title)
+        yield from self.index.completions(document, self.recent)
 
     def validate(self, document):
         """Implements input Validation for Boards."""
-        if document.text in [x.title for x in self.boards]:
+        if document.text in self.index:
             return
         raise ValidationError(
             message="{} is not a valid Board".format(document.text)
@@ -83,22 +140,70 @@ class IBoards(Completer, Validator):
 class IStacks(Completer, Validator):
     """
     Handles the interactive interaction with Deck Stacks. Also handles the
-    caching to prevent unnecessary API calls during the same session.
+    caching to prevent unnecessary API calls during the same session. The
+    Stacks of all Boards can be prefetched or refreshed in the background.
+    The completion prefers recently selected Stack titles.
     """
-    stacks: Dict[int, List[NCDeckStack]] = {}
+    stacks: Dict[int, Future]
+    updated: bool
+    recent: RecentNames
     __fetch: Fetch
+    __executor: ThreadPoolExecutor
+    __lock: threading.Lock
     __on_wait = OnWaitCallback
-    __current_stacks: Optional[List[NCDeckStack]] = None
+    __current_stacks: Optional[List[StackEntry]] = None
+    __current_index: Optional[CompletionIndex] = None
 
-    def __init__(self, fetch: Fetch, on_wait: OnWaitCallback):
+    def __init__(
+            self,
+            fetch: Fetch,
+            executor: ThreadPoolExecutor,
+            recent: RecentNames,
+            on_wait: OnWaitCallback
+    ):
+        self.stacks = {}
+        self.updated = False
+        self.recent = recent
         self.__fetch = fetch
+        self.__executor = executor
+        self.__lock = threading.Lock()
         self.__on_wait = on_wait
 
-    def select(self, board_id: int, session: PromptSession) -> NCBoard:
+    def seed(self, stacks: Dict[int, List[StackEntry]]):
+        """Uses the given (cached) Stacks by the id of their Board."""
+        with self.__lock:
+            for board_id, entries in stacks.items():
+                self.stacks[board_id] = _resolved(entries)
+
+    def refresh(self, boards: List[BoardEntry]):
+        """
+        Starts to fetch the Stacks of the given Boards in the background.
+        Known Stacks are replaced once the request succeeded.
+        """
+        for board in boards:
+            with self.__lock:
+                if board.board_id not in self.stacks:
+                    self.stacks[board.board_id] = self.__submit(board.board_id)
+                    continue
+            future = self.__submit(board.board_id)
+            future.add_done_callback(self.__on_refresh(board.board_id))
+
+    def known(self) -> Dict[int, List[StackEntry]]:
+        """Returns the Stacks which are available without waiting."""
+        with self.__lock:
+            futures = list(self.stacks.items())
+        rsl: Dict[int, List[StackEntry]] = {}
+        for board_id, future in futures:
+            stacks = _result(future)
+            if stacks is not None:
+                rsl[board_id] = stacks
+        return rsl
+
+    def select(self, board_id: int, session: PromptSession) -> StackEntry:
         """
         Queries the available Boards from the API and lets the user choose one.
         """
-        self.__current_stacks = self.__stacks_by_board(board_id)
+        self.__use_board(board_id)
         default = ""
         if len(self.__current_stacks) > 0:
             default = self.__current_stacks[0]
@@ -107,32 +212,67 @@ class IStacks(Completer, Validator):
                 "<SkyBlue><b>Stack,</b> select a Stack for the Card "
                 "(enter for '{}'): </SkyBlue>".format(default.title)
             ),
-            completer=FuzzyCompleter(self),
+            completer=self,
             validator=self,
         )
         if selection == "":
+            self.recent.use(default.title)
             return default
+        self.recent.use(selection)
         return self.__stack_by_input(board_id, selection)
 
     def list(self, board_id: int):
-        self.__current_stacks = self.__stacks_by_board(board_id)
+        self.__use_board(board_id)
         """Lists the available stacks for a given board."""
         output = "\n".join(["<DarkGreen>- {}</DarkGreen>".format(x.title)
                             for x in self.__current_stacks])
         print_formatted_text(HTML(output))
 
-    def __stacks_by_board(self, board_id: int) -> List[NCDeckStack]:
+    def __use_board(self, board_id: int):
+        """Sets the Stacks of the given Board as the current ones."""
+        stacks = self.__stacks_by_board(board_id)
+        if stacks is not self.__current_stacks:
+            self.__current_stacks = stacks
+            self.__current_index = CompletionIndex([x.title for x in stacks])
+
+    def __stacks_by_board(self, board_id: int) -> List[StackEntry]:
         """
         Returns the stacks for a given board id. Fetches them via the API
-        if not present.
+        if not present, waits if the request is still running.
         """
-        if board_id in self.stacks:
+        future = self.__request(board_id)
+        if not future.done():
+            self.__on_wait("Fetching Stacks from server...")
+        return future.result()
+
+    def __request(self, board_id: int) -> Future:
+        """Returns the request for the Stacks of a Board, starts it if new."""
+        with self.__lock:
+            if board_id not in self.stacks:
+                self.stacks[board_id] = self.__submit(board_id)
             return self.stacks[board_id]
-        self.__on_wait("Fetching Stacks from server...")
-        self.stacks[board_id] = self.__fetch.stacks_by_board(board_id)
-        return self.__stacks_by_board(board_id)
 
-    def __stack_by_input(self, board_id: int, text: str) -> NCDeckStack:
+    def __submit(self, board_id: int) -> Future:
+        """Submits a request for the Stacks of a Board to the executor."""
+        return self.__executor.submit(self.__fetch_stacks, board_id)
+
+    def __fetch_stacks(self, board_id: int) -> List[StackEntry]:
+        """Fetches the Stacks of a Board from the server."""
+        rsl = [StackEntry.from_stack(x)
+               for x in self.__fetch.stacks_by_board(board_id)]
+        self.updated = True
+        return rsl
+
+    def __on_refresh(self, board_id: int) -> Callable[[Future], None]:
+        """Returns the callback taking the result of a refresh request."""
+        def on_done(future: Future):
+            if _result(future) is None:
+                return
+            with self.__lock:
+                self.stacks[board_id] = future
+        return on_done
+
+    def __stack_by_input(self, board_id: int, text: str) -> StackEntry:
         """Returns a Stack by a given Board id and selection input."""
         stacks = self.__stacks_by_board(board_id)
         for stack in stacks:
@@ -142,13 +282,11 @@ class IStacks(Completer, Validator):
 
     def get_completions(self, document, complete_event):
         """Implements the interactive completion for Stacks."""
-        for stack in self.__current_stacks:
-            yield Completion(stack.title)
+        yield from self.__current_index.completions(document, self.recent)
 
     def validate(self, document):
         """Implements input Validation for Stacks."""
-        if document.text == "" or document.text in [
-                x.title for x in self.__current_stacks]:
+        if document.text == "" or document.text in self.__current_index:
             return
         raise ValidationError(
             message="{} is not a valid Stack in current Board".format(
@@ -160,25 +298,75 @@ class IStacks(Completer, Validator):
 class IUsers(Completer, Validator):
     """
     Handles the interactive interaction with the Nextcloud Users. Also handles
-    the caching to prevent unnecessary API calls during the same session.
+    the caching to prevent unnecessary API calls during the same session. The
+    Users are loaded in the background, they are only waited for when needed.
+    Cached Users can be refreshed in the background. The completion uses an
+    index of the user ids and prefers recently assigned Users.
     """
-    users: List[str]
+    recent: RecentNames
+    __future: Future
+    __users: Optional[List[str]] = None
+    __index: Optional[CompletionIndex] = None
+    __indexed: Optional[List[str]] = None
+    __on_wait: OnWaitCallback
+    __on_error: Callable[[str], None]
 
     def __init__(
             self,
-            fetch: Fetch,
+            future: Future,
+            recent: RecentNames,
             on_wait: OnWaitCallback,
-            on_error: Callable[[str], ]
+            on_error: Callable[[str], None]
     ):
-        on_wait("Fetching Users from server...")
+        self.recent = recent
+        self.__future = future
+        self.__on_wait = on_wait
+        self.__on_error = on_error
+
+    @property
+    def users(self) -> List[str]:
+        """The user ids, waits for the background request if necessary."""
+        if self.__users is not None:
+            return self.__users
+        if not self.__future.done():
+            self.__on_wait("Fetching Users from server...")
         try:
-            self.users = fetch.user_ids()
+            self.__users = self.__future.result()
         except NextcloudException as exc:
             msg = str(exc)
-            on_error("Couldn't load Users from server, {}.".format(
+            self.__on_error("Couldn't load Users from server, {}.".format(
                 msg[:1].lower() + msg[1:]
             ))
             sys.exit(1)
+        return self.__users
+
+    @property
+    def index(self) -> CompletionIndex:
+        """The index of the user ids, rebuilt if the Users changed."""
+        return self.__build_index(self.users)
+
+    def refresh(self, future: Future):
+        """
+        Replaces the Users with the result of the given request once it's
+        done. The current Users are kept if the request fails. The index is
+        built right away.
+        """
+        future.add_done_callback(self.__on_refresh)
+
+    def __on_refresh(self, future: Future):
+        """Takes the Users of a finished refresh request."""
+        users = _result(future)
+        if users is not None:
+            self.__build_index(users)
+            self.__users = users
+
+    def __build_index(self, users: List[str]) -> CompletionIndex:
+        """Returns the index for the given Users, builds it if necessary."""
+        index = self.__index
+        if self.__indexed is not users:
+            index = CompletionIndex(users)
+            self.__index, self.__indexed = index, users
+        return index
 
     def select(self, session: PromptSession) -> List[str]:
         """Let the user select one or more User to assign the Card to."""
@@ -189,11 +377,12 @@ class IUsers(Completer, Validator):
                     "<SkyBlue><b>Assigned user,</b> empty for none/no "
                     "additional: </SkyBlue>"
                 ),
-                completer=FuzzyCompleter(self),
+                completer=self,
                 validator=self,
             )
             if selection == "":
                 break
+            self.recent.use(selection)
             rsl.append(selection)
         return rsl
 
@@ -204,12 +393,11 @@ class IUsers(Completer, Validator):
 
     def get_completions(self, document, complete_event):
         """Implements the interactive completion for Users."""
-        for user in self.users:
-            yield Completion(user)
+        yield from self.index.completions(document, self.recent)
 
     def validate(self, document):
         """Implements input Validation for Users."""
-        if document.text == "" or document.text in self.users:
+        if document.text == "" or document.text in self.index:
             return
         raise ValidationError(
             message="{} is not a valid User".format(document.text)
@@ -241,6 +429,12 @@ class IDueDate(Validator):
             ),
             validator=self,
         )
+        return self.parse(raw)
+
+    def parse(self, raw: str) -> Optional[datetime]:
+        """
+        Converts a (validated) input to a UTC date, None for an empty input.
+        """
         if raw == "":
             return None
         try:
@@ -301,28 +495,92 @@ class Interactive:
     stacks: IStacks
     timezone: str
     __session: PromptSession
+    __executor: ThreadPoolExecutor
+    __url: str
+    __user: str
+    __cache: Optional[MetadataCache]
+    __cached: Optional[Metadata]
+    __requests: Optional[List[Future]] = None
+    __requested_at: float
 
     def __init__(self, config: Config):
+        """
+        Starts to load the Boards, the Users and the Stacks of all Boards in
+        the background. Thus the first prompt appears instantly and the data
+        is (most likely) available when it's needed. If the metadata cache is
+        enabled the cached data is used right away and only refreshed in the
+        background once it's older than the TTL.
+        """
         self.fetch = Fetch(
             config.url,
             config.user,
             config.password,
+            workers=config.workers,
         )
+        self.__executor = ThreadPoolExecutor(max_workers=config.workers)
         self.__session = PromptSession()
-        self.boards = IBoards(self.fetch, self.__on_wait, self.__on_error)
-        self.users = IUsers(self.fetch, self.__on_wait, self.__on_error)
-        self.stacks = IStacks(self.fetch, self.__on_wait)
+        self.__url = config.url
+        self.__user = config.user
+        self.__cache = config.metadata_cache()
+        self.__cached = None
+        if self.__cache is not None:
+            self.__cached = self.__cache.load(config.url, config.user)
+        cached = self.__cached
+        if cached is None or self.__cache.is_stale(cached):
+            self.__requested_at = time.time()
+            self.__requests = [
+                self.__executor.submit(self.__fetch_boards),
+                self.__executor.submit(self.fetch.user_ids),
+            ]
+        if cached is None:
+            boards, users = self.__requests
+        else:
+            boards, users = _resolved(cached.boards), _resolved(cached.users)
+        self.boards = IBoards(
+            boards,
+            RecentNames(cached.recent_boards if cached else None),
+            self.__on_wait,
+            self.__on_error,
+        )
+        self.users = IUsers(
+            users,
+            RecentNames(cached.recent_users if cached else None),
+            self.__on_wait,
+            self.__on_error,
+        )
+        self.stacks = IStacks(
+            self.fetch,
+            self.__executor,
+            RecentNames(cached.recent_stacks if cached else None),
+            self.__on_wait,
+        )
+        if cached is not None:
+            self.stacks.seed(cached.stacks)
+            # Builds the indexes of the cached names in the background.
+            self.__executor.submit(lambda: self.boards.index)
+            self.__executor.submit(lambda: self.users.index)
+        if self.__requests is not None:
+            self.boards.refresh(self.__requests[0])
+            self.users.refresh(self.__requests[1])
+            self.__requests[0].add_done_callback(self.__refresh_stacks)
         self.timezone = config.timezone
 
-    async def __init_board(self) -> IBoards:
-        """
-        Instantiates a new IBoards instance. As this includes a API call this
-        method wraps the call async.
-        """
+    def __fetch_boards(self) -> List[BoardEntry]:
+        """Fetches the Boards from the server."""
+        return [BoardEntry.from_board(x) for x in self.fetch.all_boards()]
+
+    def __refresh_stacks(self, boards: Future):
+        """Starts to fetch the Stacks of all Boards once they're known."""
+        if _result(boards) is None:
+            return
+        try:
+            self.stacks.refresh(boards.result())
+        except RuntimeError:
+            # The executor was already shut down.
+            pass
 
     def add(self):
         """Interactively adds a new card to the Deck."""
-        self.fetch.user_ids()
         title = self.__session.prompt(
             HTML("<SkyBlue><b>Title,</b> enter the Card title: </SkyBlue>"),
             validator=TitleValidator()
@@ -365,8 +623,8 @@ class Interactive:
 
     def __add_card(
         self,
-        board: NCBoard,
-        stack: NCDeckStack,
+        board: BoardEntry,
+        stack: StackEntry,
         data: NCCardPost,
     ) -> NCDeckCard:
         """Add a Card with the given data to the remote Nextcloud Deck."""
@@ -380,28 +638,89 @@ class Interactive:
     def __assign_users(
         self,
         users: List[str],
-        board: NCBoard,
-        stack: NCDeckStack,
+        board: BoardEntry,
+        stack: StackEntry,
         card: NCDeckCard,
     ):
-        """Assigns the given users to the cards."""
-        for user in users:
-            self.__on_wait("Assign {} to Card...".format(user))
-            try:
-                self.fetch.assign_user_to_card(
-                    board.board_id,
-                    stack.stack_id,
-                    card.card_id, user
+        """
+        Assigns the given users to the cards. The assignments are sent in
+        parallel, all errors are reported together afterwards.
+        """
+        if len(users) == 0:
+            return
+        self.__on_wait("Assign {} to Card...".format(", ".join(users)))
+        results: List[UserAssignment] = self.fetch.assign_users_to_card(
+            board.board_id,
+            stack.stack_id,
+            card.card_id,
+            users,
+        )
+        not_on_board = [x.user_uid for x in results if x.error is not None
+                        and x.error.user_not_part_of_board]
+        if len(not_on_board) > 0:
+            self.__on_error(
+                "Card couldn't be assigned to {} as {} part of the Board {}"
+                .format(
+                    ", ".join(not_on_board),
+                    "this user isn't" if len(not_on_board) == 1
+                    else "these users aren't",
+                    board.title,
                 )
-            except DeckException as exc:
-                if exc.user_not_part_of_board:
-                    self.__on_error(
-                        "<Red>Card couldn't be assigned to {} as this user "
-                        "isn't part of the Board {}</Red>"
-                        .format(user, board.title)
-                    )
-                else:
-                    raise exc
+            )
+        for result in results:
+            if result.error is not None and \
+                    not result.error.user_not_part_of_board:
+                self.__on_error("Card couldn't be assigned to {}, {}".format(
+                    result.user_uid, result.error))
+
+    def close(self):
+        """
+        Stops the background requests, closes the connections and updates the
+        metadata cache.
+        """
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+        self.fetch.close()
+        self.__save_metadata()
+
+    def __save_metadata(self):
+        """
+        Saves the Boards, Users and Stacks to the metadata cache if anything
+        new was fetched from the server or selected by the user. Requests
+        which didn't finish (yet) are ignored, the cached data is kept in
+        this case.
+        """
+        if self.__cache is None:
+            return
+        boards, users, fetched_at = None, None, 0.0
+        if self.__requests is not None:
+            boards = _result(self.__requests[0])
+            users = _result(self.__requests[1])
+            fetched_at = self.__requested_at
+        recent = [self.boards.recent, self.stacks.recent, self.users.recent]
+        if boards is None and users is None and not self.stacks.updated \
+                and not any(x.changed for x in recent):
+            return
+        cached = self.__cached
+        if boards is None and cached is not None:
+            boards, fetched_at = cached.boards, cached.fetched_at
+        if users is None and cached is not None:
+            users = cached.users
+        if boards is None or users is None:
+            return
+        try:
+            self.__cache.save(Metadata(
+                url=self.__url,
+                user=self.__user,
+                fetched_at=fetched_at,
+                boards=boards,
+                users=users,
+                stacks=self.stacks.known(),
+                recent_boards=self.boards.recent.names,
+                recent_stacks=self.stacks.recent.names,
+                recent_users=self.users.recent.names,
+            ))
+        except OSError as exc:
+            self.__on_error("Couldn't save the metadata cache, {}".format(exc))
 
     def __on_wait(self, msg: str):
         """Output informing the user about a ongoing request."""
@@ -415,3 +734,21 @@ class Interactive:
     @staticmethod
     def __handle_nextcloud_exception(exc: NextcloudException):
         """Handles the Nextcloud Exception."""
+
+
+def _resolved(value: Any) -> Future:
+    """Returns a Future which is already done with the given result."""
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+def _result(future: Future) -> Optional[Any]:
+    """
+    Returns the result of a finished Future, None if it isn't done (yet), was
+    cancelled or failed.
+    """
+    if not future.done() or future.cancelled() or \
+            future.exception() is not None:
+        return None
+    return future.result()
@@ -1,25 +1,60 @@
 """
 Main file for the CLI interface.
 """
+from datetime import datetime, timedelta
 import logging
+from typing import List, Optional
 
 from deck_cli.cli.config import Config as ConfigClass
 from deck_cli.cli import fetch
+from deck_cli.cli.importer import ImportException, ImportFile, ImportJournal
+from deck_cli.cli.importer import Importer
 from deck_cli.cli.interactive import Interactive
 from deck_cli.cli.query import Query
-from deck_cli.cli.report import Report
+from deck_cli.cli.report import BatchReport, Report, ReportManifest
+from deck_cli.deck.filter import CardFilter, FilterException
 
 import click
+from marshmallow import ValidationError
+import pytz
+import yaml
 
 
 class State:
     """Contains the global state for all subcommands of the group."""
     do_debug: bool = False
     muted: bool = False
+    workers: Optional[int] = None
+    async_fetch: bool = False
+    fast_decode: bool = False
 
-    def __init__(self, do_debug: bool, muted: bool):
+    def __init__(
+            self,
+            do_debug: bool,
+            muted: bool,
+            workers: Optional[int],
+            async_fetch: bool,
+            fast_decode: bool,
+    ):
         self.do_debug = do_debug
         self.do_mute = muted
+        self.workers = workers
+        self.async_fetch = async_fetch
+        self.fast_decode = fast_decode
+
+    def load_config(self, raw: click.File) -> ConfigClass:
+        """
+        Loads the configuration file and applies the overrides given by the
+        global command line options.
+        """
+        cfg = ConfigClass.from_yaml(raw)
+        if self.workers is not None:
+            cfg.workers = self.workers
+        if self.async_fetch:
+            cfg.async_fetch = True
+        if self.fast_decode:
+            cfg.fast_decode = True
+        return cfg
 
     def on_progress(
             self,
@@ -46,8 +81,24 @@ pass_state = click.make_pass_decorator(State)
 @click.group()
 @click.option("-d", "--debug", is_flag=True)
 @click.option("--muted", is_flag=True, help="disable the progress update")
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    help="number of parallel API requests, overrides the config",
+)
+@click.option(
+    "--async-fetch",
+    is_flag=True,
+    help="use the asyncio based API client",
+)
+@click.option(
+    "--fast-decode",
+    is_flag=True,
+    help="read the API responses without validating them",
+)
 @click.pass_context
-def cli(ctx, debug, muted):
+def cli(ctx, debug, muted, workers, async_fetch, fast_decode):
     """
     deck-cli is a collection of CLI tools for working with the Deck App
     from Nextcloud.
@@ -55,7 +106,7 @@ def cli(ctx, debug, muted):
     if debug:
         logger = logging.getLogger("deck")
         logger.setLevel(logging.DEBUG)
-    ctx.obj = State(debug, muted)
+    ctx.obj = State(debug, muted, workers, async_fetch, fast_decode)
 
 
 @click.command()
@@ -66,9 +117,12 @@ def cli(ctx, debug, muted):
 @pass_state
 def add(state, config):
     """Add a new card to a deck."""
-    cfg = ConfigClass.from_yaml(config)
+    cfg = state.load_config(config)
     intr = Interactive(cfg)
-    intr.add()
+    try:
+        intr.add()
+    finally:
+        intr.close()
 
 
 @click.command()
@@ -79,6 +133,40 @@ def config(path: click.File):
     path.write(bytes(cfg.to_yaml(), "utf-8"))
 
 
+@click.command()
+@click.argument(
+    "CONFIG",
+    type=click.File("r"),
+)
+@click.option(
+    "--http",
+    is_flag=True,
+    help="also clear the cache of the API responses",
+)
+@pass_state
+def clear_cache(state, config: click.File, http: bool):
+    """
+    Clears the cached Boards, Stacks and Users used by the add command. They
+    are fetched from the server again on the next run.
+    """
+    cfg = state.load_config(config)
+    metadata = cfg.metadata_cache()
+    if metadata is None:
+        print("metadata cache is disabled")
+    elif metadata.clear():
+        print("cleared metadata cache {}".format(metadata.path))
+    else:
+        print("metadata cache {} is already empty".format(metadata.path))
+    if not http:
+        return
+    responses = cfg.response_cache()
+    if responses is None:
+        print("API response cache is disabled")
+        return
+    responses.clear()
+    print("cleared API response cache {}".format(responses.path))
+
+
 @click.command()
 @click.argument(
     "CONFIG",
@@ -87,15 +175,101 @@ def config(path: click.File):
 @click.option(
     "-o",
     "--output",
-    type=click.File("w"),
+    type=click.Path(dir_okay=False),
     help="path to output file",
     default="api-dump.yaml"
 )
+@click.option(
+    "-i",
+    "--incremental",
+    is_flag=True,
+    help="only fetch boards changed since the existing dump at the output "
+         "path",
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(["yaml", "snapshot"], case_sensitive=False),
+    help="yaml (human-readable) or snapshot (compact binary)",
+    default="yaml",
+)
 @pass_state
-def dump(state, config: click.File, output: click.File):
+def dump(
+    state,
+    config: click.File,
+    output: str,
+    incremental: bool,
+    fmt: click.Choice,
+):
     """Dumps the Deck from the API and saves to the given path."""
-    cfg = ConfigClass.from_yaml(config)
-    fetch.deck_to_file(cfg, output, state.on_progress)
+    cfg = state.load_config(config)
+    fetch.deck_to_file(
+        cfg, output, state.on_progress, incremental, fmt.lower())
+
+
+@click.command(name="import")
+@click.argument(
+    "CONFIG",
+    type=click.File("r"),
+)
+@click.argument(
+    "CARDS",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "-j",
+    "--journal",
+    type=click.Path(dir_okay=False),
+    help="progress of the import, used to resume it (default CARDS.journal)",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="only validate the Cards, don't create them",
+)
+@pass_state
+def import_cards(
+    state,
+    config: click.File,
+    cards: str,
+    journal: Optional[str],
+    check: bool,
+):
+    """
+    Imports Cards from a CSV or YAML file. All Cards are validated before
+    the first one is created. Run the command again with the same journal to
+    resume a partially failed import.
+    """
+    cfg = state.load_config(config)
+    try:
+        import_file = ImportFile.from_file(cards)
+    except ValidationError as exc:
+        raise click.BadParameter(str(exc.messages), param_hint="CARDS")
+    except (yaml.YAMLError, UnicodeDecodeError) as exc:
+        raise click.BadParameter(str(exc), param_hint="CARDS")
+    if journal is None:
+        journal = "{}.journal".format(cards)
+    importer = Importer(cfg, import_file.cards, ImportJournal(journal))
+    try:
+        try:
+            tasks = importer.prepare()
+        except ImportException as exc:
+            raise click.ClickException(str(exc))
+        if check:
+            print("{} Cards are valid".format(len(tasks)))
+            return
+        results = importer.run(tasks, print)
+    finally:
+        importer.close()
+    print("{} created, {} resumed, {} skipped, {} failed".format(
+        *[len([x for x in results if x.status == status])
+          for status in ("created", "resumed", "skipped", "failed")]))
+    failed = [x for x in results if x.status == "failed"]
+    if len(failed) > 0:
+        raise click.ClickException(
+            "{} rows failed, run the import again to retry them".format(
+                len(failed)))
 
 
 @click.command()
@@ -130,7 +304,7 @@ def mail_template():
 )
 @click.option(
     "--dump",
-    type=click.File("r"),
+    type=click.File("rb"),
     help="path to Deck API dump",
 )
 # @click.option(
@@ -147,6 +321,19 @@ def mail_template():
     type=click.File("w"),
     help="path to output file",
 )
+@click.option(
+    "-m",
+    "--manifest",
+    type=click.File("r"),
+    help="render all reports listed in the manifest (ignores -b and -o)",
+)
+@click.option(
+    "-p",
+    "--processes",
+    type=click.IntRange(min=1),
+    help="number of processes rendering the reports of a manifest",
+    default=1,
+)
 @pass_state
 def report(
     state,
@@ -155,9 +342,21 @@ def report(
     dump: click.File,
     # fmt: click.Choice,
     output: click.File,
+    manifest: Optional[click.File],
+    processes: int,
 ):
     """The report command creates a overview over all tasks."""
-    cfg = ConfigClass.from_yaml(config)
+    cfg = state.load_config(config)
+    if manifest is not None:
+        batch = BatchReport(
+            ReportManifest.from_yaml(manifest.read()),
+            cfg,
+            dump,
+            processes,
+            state.on_progress,
+        )
+        batch.render()
+        return
     rep = Report(blocks, cfg, dump, "markdown", output, state.on_progress)
     rep.render()
 
@@ -174,18 +373,129 @@ def query():
 )
 @click.option(
     "--dump",
-    type=click.File("r"),
+    type=click.File("rb"),
     help="path to Deck API dump",
 )
 @pass_state
 def users(state, config: click.File, dump: click.File):
     """List the available users."""
-    cfg = ConfigClass.from_yaml(config)
+    cfg = state.load_config(config)
     query = Query(cfg, dump, state.on_progress)
     query.users()
 
 
+@click.command()
+@click.argument(
+    "CONFIG",
+    type=click.File("r"),
+)
+@click.option(
+    "--dump",
+    type=click.File("rb"),
+    help="path to Deck API dump",
+)
+@click.option(
+    "--overdue",
+    is_flag=True,
+    help="only cards which are overdue (combined with --days: overdue or "
+         "due within the given days)",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=0),
+    help="only cards due within the given number of days",
+)
+@click.option(
+    "--after",
+    type=click.DateTime(),
+    help="only cards due at or after the date (in the configured timezone)",
+)
+@click.option(
+    "--before",
+    type=click.DateTime(),
+    help="only cards due before the date (in the configured timezone)",
+)
+@click.option(
+    "--done",
+    is_flag=True,
+    help="include cards in done stacks",
+)
+@pass_state
+def due(
+    state,
+    config: click.File,
+    dump: click.File,
+    overdue: bool,
+    days: Optional[int],
+    after: Optional[datetime],
+    before: Optional[datetime],
+    done: bool,
+):
+    """List the cards with a due date, sorted by it. Cards in done stacks are
+    omitted."""
+    cfg = state.load_config(config)
+    tz = pytz.timezone(cfg.timezone)
+    now = datetime.now(tz=pytz.utc)
+    start = None if after is None else tz.localize(after)
+    end = None if before is None else tz.localize(before)
+    limit: Optional[datetime] = None
+    if days is not None:
+        limit = now + timedelta(days=days)
+        if not overdue:
+            start = now if start is None else max(start, now)
+    elif overdue:
+        limit = now
+    if limit is not None:
+        end = limit if end is None else min(end, limit)
+    query = Query(cfg, dump, state.on_progress)
+    query.due(start, end, done)
+
+
+@click.command(context_settings=dict(ignore_unknown_options=True))
+@click.argument(
+    "CONFIG",
+    type=click.File("r"),
+)
+@click.argument(
+    "FILTER",
+    nargs=-1,
+)
+@click.option(
+    "--dump",
+    type=click.File("rb"),
+    help="path to Deck API dump",
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(["table", "json", "csv"], case_sensitive=False),
+    help="output format",
+    default="table",
+)
+@pass_state
+def cards(
+    state,
+    config: click.File,
+    filter: List[str],
+    dump: click.File,
+    fmt: click.Choice,
+):
+    """List the cards matching the FILTER (e.g. board:Backend
+    state:backlog,progress assignee:alice due:..+7d -label:wontfix)."""
+    cfg = state.load_config(config)
+    try:
+        card_filter = CardFilter.parse(
+            " ".join(filter), pytz.timezone(cfg.timezone))
+    except FilterException as err:
+        raise click.BadParameter(str(err), param_hint="FILTER")
+    query = Query(cfg, dump, state.on_progress)
+    query.cards(card_filter, fmt.lower())
+
+
 query.add_command(users)
+query.add_command(due)
+query.add_command(cards)
 
 
 @click.command()
@@ -195,9 +505,11 @@ def report_template():
 
 
 cli.add_command(add)
+cli.add_command(clear_cache)
 cli.add_command(config)
 cli.add_command(dump)
+cli.add_command(import_cards)
 # cli.add_command(mail)
 # cli.add_command(mail_template)
-# cli.add_command(query)
+cli.add_command(query)
 cli.add_command(report)
@@ -0,0 +1,116 @@
+"""
+Persistent cache for the metadata used by the interactive commands: the
+titles and ids of the Boards and their Stacks, the user ids and the names
+selected recently. The metadata is saved to a single JSON file after a
+session and read at the start of the next one. Thus the completion can start
+with the cached names right away. Entries older than the TTL are still used
+but refreshed in the background (stale-while-revalidate).
+"""
+from dataclasses import dataclass, field
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from deck_cli.deck.models import NCBoard, NCDeckStack
+from deck_cli.deck.schema import schema_for
+
+from marshmallow import ValidationError
+
+
+@dataclass
+class BoardEntry:
+    """The title and id of a Board."""
+    board_id: int
+    title: str
+
+    @classmethod
+    def from_board(cls, board: NCBoard) -> 'BoardEntry':
+        """Returns the entry for a Board of the API."""
+        return cls(board_id=board.board_id, title=board.title)
+
+
+@dataclass
+class StackEntry:
+    """The title and id of a Stack."""
+    stack_id: int
+    title: str
+
+    @classmethod
+    def from_stack(cls, stack: NCDeckStack) -> 'StackEntry':
+        """Returns the entry for a Stack of the API."""
+        return cls(stack_id=stack.stack_id, title=stack.title)
+
+
+@dataclass
+class Metadata:
+    """
+    The metadata of a Nextcloud instance for a given user. The Stacks are
+    mapped by the id of their Board. The time the Boards were fetched is
+    given as a Unix timestamp. The recently selected names (most recent
+    first) are used to rank the completions.
+    """
+    url: str
+    user: str
+    fetched_at: float
+    boards: List[BoardEntry]
+    users: List[str]
+    stacks: Dict[int, List[StackEntry]]
+    recent_boards: List[str] = field(default_factory=list)
+    recent_stacks: List[str] = field(default_factory=list)
+    recent_users: List[str] = field(default_factory=list)
+
+    def age(self) -> float:
+        """Returns the age of the metadata in seconds."""
+        return time.time() - self.fetched_at
+
+
+class MetadataCache:
+    """
+    Stores the Metadata in a JSON file. Metadata older than ttl (in seconds)
+    is considered to be stale.
+    """
+    path: str
+    ttl: int
+
+    def __init__(self, path: str, ttl: int = 3600):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+
+    def load(self, url: str, user: str) -> Optional[Metadata]:
+        """
+        Returns the cached Metadata for the given instance and user, None if
+        there is none or the file is unreadable.
+        """
+        try:
+            with open(self.path, "r") as fil:
+                data = json.load(fil)
+            rsl = schema_for(Metadata).load(data)
+        except (IOError, ValueError, ValidationError):
+            return None
+        if rsl.url != url or rsl.user != user:
+            return None
+        return rsl
+
+    def is_stale(self, metadata: Metadata) -> bool:
+        """Returns whether the given Metadata is older than the TTL."""
+        return metadata.age() > self.ttl
+
+    def save(self, metadata: Metadata):
+        """Saves the Metadata, the file is replaced atomically."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        raw = json.dumps(schema_for(Metadata).dump(metadata))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as fil:
+            fil.write(raw)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> bool:
+        """Removes the cached Metadata, returns whether there was any."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            return False
+        return True
@@ -1,15 +1,32 @@
 """
 Query contents of the Deck content and outputs it as a string.
 """
-from typing import Optional
+from datetime import datetime, tzinfo
+import csv
+import json
+import sys
+from typing import Any, Dict, List, Optional, Union
 
 
 from deck_cli.cli import fetch
 from deck_cli.cli.config import Config
-from deck_cli.deck.fetch import Fetch, ProgressCallback
-from deck_cli.deck.simplified import Card, Deck, UserWithCards
+from deck_cli.deck.fetch import ProgressCallback
+from deck_cli.deck.filter import CardFilter
+from deck_cli.deck.simplified import Card, CardState, Deck, UserWithCards
+from deck_cli.deck.snapshot import SnapshotDeck
 
 import click
+import pytz
+
+_STATE_NAMES = {
+    None: "",
+    CardState.BACKLOG: "backlog",
+    CardState.IN_PROGRESS: "progress",
+    CardState.DONE: "done",
+}
+_COLUMNS = ["id", "board", "stack", "state", "due", "name", "labels",
+            "assignees", "archived"]
+_TABLE_COLUMNS = ["id", "board", "stack", "state", "due", "name", "assignees"]
 
 
 class Query:
@@ -36,20 +53,93 @@ class Query:
         deck = self.__fetch_data()
         print(deck.users)
 
-    def __fetch_data(self) -> Deck:
+    def due(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        include_done: bool = False,
+    ):
+        """
+        Lists the Cards due in the given interval (start inclusive, end
+        exclusive, None for no limit) sorted by their due date. Cards in a
+        done Stack are omitted unless include_done is set.
+        """
+        deck = self.__fetch_data()
+        tz = pytz.timezone(self.config.timezone)
+        for card in deck.due_cards(start, end, include_done):
+            print("{}  {} / {}: {}{}".format(
+                card.duedate.astimezone(tz).strftime("%Y-%m-%d %H:%M"),
+                card.board_name,
+                card.stack_name,
+                card.name,
+                _assigned_users(card),
+            ))
+
+    def cards(self, card_filter: CardFilter, fmt: str = "table"):
+        """
+        Lists the Cards matching the filter in the order of the Deck. The
+        format is either table, json or csv.
+        """
+        deck = self.__fetch_data()
+        tz = pytz.timezone(self.config.timezone)
+        rows = [_card_row(x, tz) for x in card_filter.apply(deck)]
+        if fmt == "json":
+            json.dump(rows, sys.stdout, indent=2, ensure_ascii=False)
+            print()
+        elif fmt == "csv":
+            writer = csv.DictWriter(sys.stdout, fieldnames=_COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(
+                    row,
+                    labels=";".join(row["labels"]),
+                    assignees=";".join(row["assignees"]),
+                ))
+        else:
+            _print_table(rows)
+
+    def __fetch_data(self) -> Union[Deck, SnapshotDeck]:
         """Fetches the data from the API or loads it from the dump file."""
         if self.dump is None:
-            f = Fetch(
-                self.config.url,
-                self.config.user,
-                self.config.password,
-                progress_callback=self.on_progress
-            )
-            return Deck.from_nc_boards(
-                f.all_boards_with_stacks(),
-                self.config.backlog_stacks,
-                self.config.progress_stacks,
-                self.config.done_stacks
-            )
+            return fetch.fetch_deck(self.config, self.on_progress)
         deck = fetch.load_deck_from_file(self.dump)
         return deck
+
+
+def _assigned_users(card: Card) -> str:
+    """Returns the names of the assigned Users for the output."""
+    if len(card.assigned_users) == 0:
+        return ""
+    return " ({})".format(", ".join(x.full_name for x in card.assigned_users))
+
+
+def _card_row(card: Card, tz: tzinfo) -> Dict[str, Any]:
+    """Returns the fields of a Card for the output."""
+    due = ""
+    if card.duedate is not None:
+        due = card.duedate.astimezone(tz).strftime("%Y-%m-%d %H:%M")
+    return dict(
+        id=card.identifier,
+        board=card.board_name,
+        stack=card.stack_name,
+        state=_STATE_NAMES[card.state],
+        due=due,
+        name=card.name,
+        labels=card.labels,
+        assignees=[x.username for x in card.assigned_users],
+        archived=card.archived,
+    )
+
+
+def _print_table(rows: List[Dict[str, Any]]):
+    """Prints the rows as a table with aligned columns."""
+    cells = [[str(x) for x in _TABLE_COLUMNS]]
+    for row in rows:
+        cells.append([
+            ", ".join(row[x]) if isinstance(row[x], list) else str(row[x])
+            for x in _TABLE_COLUMNS])
+    widths = [max(len(x[i]) for x in cells)
+              for i in range(len(_TABLE_COLUMNS))]
+    for line in cells:
+        print("  ".join(
+            x.ljust(widths[i]) for i, x in enumerate(line)).rstrip())
@@ -2,18 +2,25 @@
 Contains all functionality to create the reports for
 the Desk content.
 """
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
-from typing import List, Optional
-import importlib.resources
+from typing import List, Optional, TextIO, Union
+import functools
+import sys
 
 from deck_cli.cli import fetch
 from deck_cli.cli.config import Config
-from deck_cli.deck.fetch import Fetch, ProgressCallback
+from deck_cli.cli.yaml_io import load_yaml
+from deck_cli.deck.fetch import ProgressCallback
+from deck_cli.deck.schema import schema_for
 from deck_cli.deck.simplified import Card, Deck, UserWithCards
+from deck_cli.deck.snapshot import SnapshotDeck
 
 import click
-from jinja2 import Template
+from marshmallow import validate
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
 
 
 class ReportFromat(Enum):
@@ -22,20 +29,97 @@ class ReportFromat(Enum):
     MARKDOWN = "markdown-report.jinja"
 
 
+STREAM_BUFFER_SIZE = 64
+"""
+Number of template chunks collected before they're written to the output
+while rendering a report.
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def template_environment() -> Environment:
+    """
+    Returns the Jinja environment for the report templates. The templates
+    are loaded from the package and compiled only once per process. The
+    compiled bytecode is also cached on disk (in the temporary directory of
+    the system) and thus reused by further runs.
+    """
+    return Environment(
+        loader=PackageLoader("deck_cli.cli", "templates"),
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
+
+
 class ReportOptions:
-    """The options for a report."""
+    """
+    The options for a report. The report can be limited to some Boards and
+    Users (given by their name and username), None includes all of them.
+    """
     fmt: ReportFromat
     do_overdue: bool
     do_overview: bool
     do_stats: bool
+    boards: Optional[List[str]]
+    users: Optional[List[str]]
 
-    def __init__(self, blocks: click.Choice, fmt: click.Choice):
+    def __init__(
+        self,
+        blocks: click.Choice,
+        fmt: click.Choice,
+        boards: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+    ):
         self.fmt = ReportFromat.PLAIN
         if fmt == "markdown":
             self.fmt = ReportFromat.MARKDOWN
         self.do_overdue = "overdue" in blocks
         self.do_overview = "overview" in blocks
         self.do_stats = "stats" in blocks
+        self.boards = boards
+        self.users = users
+
+
+@dataclass
+class ReportJob:
+    """A single report of a manifest."""
+    output: str = field(
+        metadata=dict(
+            description="Path to the output file")
+    )
+    blocks: List[str] = field(
+        default_factory=lambda: ["overdue", "overview", "stats"],
+        metadata=dict(
+            description="Blocks of the report (overdue, overview, stats)",
+            validate=validate.ContainsOnly(["overdue", "overview", "stats"]))
+    )
+    boards: Optional[List[str]] = field(
+        default=None,
+        metadata=dict(
+            description="Only include these Boards, none for all")
+    )
+    users: Optional[List[str]] = field(
+        default=None,
+        metadata=dict(
+            description="Only include Cards of these users, none for all")
+    )
+
+    def options(self) -> ReportOptions:
+        """Returns the report options of the job."""
+        return ReportOptions(self.blocks, "markdown", self.boards, self.users)
+
+
+@dataclass
+class ReportManifest:
+    """Lists multiple reports which are rendered from the same Deck."""
+    reports: List[ReportJob] = field(
+        metadata=dict(
+            description="The reports to render")
+    )
+
+    @classmethod
+    def from_yaml(cls, raw: str) -> 'ReportManifest':
+        """Loads the manifest from a given YAML string."""
+        return schema_for(ReportManifest).load(load_yaml(raw))
 
 
 class Report:
@@ -64,42 +148,135 @@ class Report:
             self.on_progress = on_progress
 
     def render(self):
-        """Fetches the data and renders the requested report."""
-        deck: Deck
-        if self.dump_file is None:
-            deck = self.__fetch_deck()
-        else:
-            deck = fetch.load_deck_from_file(self.dump_file)
+        """
+        Fetches the data and renders the requested report. The report is
+        written to the output (or stdout) while it's rendered instead of
+        building the whole text in memory first.
+        """
+        deck = load_deck(self.config, self.dump_file, self.on_progress)
+        write_report(deck, self.options, self.output)
 
-        users = UserWithCards.from_deck(deck)
-        overdue: List[Card] = []
-        if self.options.do_overdue:
-            overdue = deck.overdue_cards()
-        tpl_raw = importlib.resources.read_text(
-            "deck_cli.cli.templates", self.options.fmt.value)
-        tpl = Template(tpl_raw)
-        rsl = tpl.render(
-            now=datetime.now(tz=timezone.utc),
-            options=self.options,
-            overdue=Card.by_board(overdue),
-            users=users
-        )
 
-        if self.output is not None:
-            self.output.write(rsl)
-        else:
-            print(rsl)
-
-    def __fetch_deck(self) -> List[UserWithCards]:
-        f = Fetch(
-            self.config.url,
-            self.config.user,
-            self.config.password,
-            progress_callback=self.on_progress
-        )
-        return Deck.from_nc_boards(
-            f.all_boards_with_stacks(),
-            self.config.backlog_stacks,
-            self.config.progress_stacks,
-            self.config.done_stacks
+class BatchReport:
+    """
+    Renders all reports of a manifest. The Deck is fetched (or loaded) only
+    once. The reports can be rendered in parallel by multiple processes.
+    """
+    config: Config
+    dump_file: Optional[click.File]
+    manifest: ReportManifest
+    processes: int
+    on_progress: ProgressCallback
+
+    def __init__(
+        self,
+        manifest: ReportManifest,
+        config: Config,
+        dump: Optional[click.File],
+        processes: int,
+        on_progress: ProgressCallback
+    ):
+        self.manifest = manifest
+        self.config = config
+        self.dump_file = dump
+        self.processes = processes
+        self.on_progress = on_progress
+
+    def render(self):
+        """Fetches the data and renders all reports."""
+        deck = load_deck(self.config, self.dump_file, self.on_progress)
+        if isinstance(deck, SnapshotDeck):
+            snapshot = deck
+            deck = snapshot.deck()
+            snapshot.close()
+        jobs = self.manifest.reports
+        if self.processes < 2 or len(jobs) < 2:
+            for index, job in enumerate(jobs):
+                _render_job(job, deck)
+                self.__job_done(index, job)
+            return
+        with ProcessPoolExecutor(
+            max_workers=min(self.processes, len(jobs)),
+            initializer=_init_worker,
+            initargs=(deck,),
+        ) as executor:
+            futures = [executor.submit(_render_job, x) for x in jobs]
+            for index, (job, future) in enumerate(zip(jobs, futures)):
+                future.result()
+                self.__job_done(index, job)
+
+    def __job_done(self, index: int, job: ReportJob):
+        self.on_progress(
+            index + 1,
+            len(self.manifest.reports),
+            "rendered report {}".format(job.output),
         )
+
+
+def load_deck(
+    config: Config,
+    dump: Optional[click.File],
+    on_progress: ProgressCallback,
+) -> Union[Deck, SnapshotDeck]:
+    """Loads the Deck from the dump if given, fetches it otherwise."""
+    if dump is None:
+        return fetch.fetch_deck(config, on_progress)
+    return fetch.load_deck_from_file(dump)
+
+
+def write_report(
+    deck: Union[Deck, SnapshotDeck],
+    options: ReportOptions,
+    output: Optional[TextIO],
+):
+    """
+    Renders a report for the Deck and writes it to the output (stdout if
+    None).
+    """
+    if options.boards is not None:
+        deck = Deck.from_boards(
+            [x for x in deck.boards if x.name in options.boards])
+
+    users: List[UserWithCards] = []
+    if options.do_overview:
+        users = UserWithCards.from_deck(deck)
+        if options.users is not None:
+            users = [x for x in users if x.username in options.users]
+    overdue: List[Card] = []
+    if options.do_overdue:
+        overdue = deck.overdue_cards()
+        if options.users is not None:
+            overdue = [x for x in overdue if any(
+                y.username in options.users for y in x.assigned_users)]
+    tpl = template_environment().get_template(options.fmt.value)
+    stream = tpl.stream(
+        now=datetime.now(tz=timezone.utc),
+        options=options,
+        overdue=Card.by_board(overdue),
+        users=users
+    )
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+
+    if output is not None:
+        stream.dump(output)
+    else:
+        stream.dump(sys.stdout)
+        print()
+
+
+_worker_deck: Optional[Deck] = None
+"""The Deck used by the report worker processes."""
+
+
+def _init_worker(deck: Deck):
+    """Sets the Deck of a worker process."""
+    global _worker_deck
+    _worker_deck = deck
+
+
+def _render_job(job: ReportJob, deck: Optional[Deck] = None):
+    """Renders a report of a manifest to its output file."""
+    if deck is None:
+        deck = _worker_deck
+    with open(job.output, "w") as fil:
+        write_report(deck, job.options(), fil)
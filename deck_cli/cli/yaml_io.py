@@ -0,0 +1,30 @@
+"""
+Reading and writing of YAML files (configuration and dumps). Uses the LibYAML
+bindings of PyYAML if they are available and falls back to the pure Python
+implementation otherwise. The output is the same for both. Only the safe
+subset of YAML is supported, thus no arbitrary Python objects are
+constructed when loading a file.
+"""
+from typing import Any
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as Dumper
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeDumper as Dumper
+    from yaml import SafeLoader as Loader
+
+
+def load_yaml(raw: Any) -> Any:
+    """Parses the given YAML string, bytes or file."""
+    return yaml.load(raw, Loader=Loader)
+
+
+def dump_yaml(data: Any, **kwargs) -> Any:
+    """
+    Serializes the data as YAML. The keyword arguments are passed to
+    yaml.dump (use encoding to get bytes).
+    """
+    return yaml.dump(data, Dumper=Dumper, **kwargs)
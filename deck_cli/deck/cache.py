@@ -0,0 +1,159 @@
+"""
+On-disk cache for the responses of the Deck API. The API returns an ETag
+for each response. The cache stores the ETag together with the body so the
+next request for the same URL can be sent as a conditional request. If the
+resource hasn't changed the server answers with 304 (Not Modified) and the
+cached body is used instead of downloading it again.
+
+The decoded body of the entries most recently reported as unchanged is kept
+in memory. Thus a resource which is requested repeatedly within the same
+process isn't decoded again as long as it doesn't change.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    """
+    A cached response. The data holds the decoded body once it's known and
+    must not be altered as it's shared by all users of the entry.
+    """
+    url: str
+    etag: str
+    body: str
+    data: Any = None
+
+
+class ResponseCache:
+    """
+    Stores the responses as files in the given directory. The total size of
+    the cache is bounded by max_size (in bytes), the least recently used
+    entries are evicted first. The decoded bodies of up to memory_entries
+    entries are kept in memory.
+    """
+    path: str
+    max_size: int
+    memory_entries: int
+    __sizes: Dict[str, int]
+    __decoded: 'OrderedDict[str, CacheEntry]'
+    __lock: threading.Lock
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 50 * 1024 * 1024,
+        memory_entries: int = 16,
+    ):
+        self.path = os.path.expanduser(path)
+        self.max_size = max_size
+        self.memory_entries = memory_entries
+        self.__decoded = OrderedDict()
+        self.__lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        self.__sizes = {}
+        for name in os.listdir(self.path):
+            if name.endswith(".json"):
+                self.__sizes[name] = os.path.getsize(
+                    os.path.join(self.path, name))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Returns the cached entry for the given key, None if there is none.
+        Marks the entry as recently used. Entries kept in memory are returned
+        together with their decoded body.
+        """
+        file_path = os.path.join(self.path, self.__file_name(key))
+        with self.__lock:
+            entry = self.__decoded.get(key)
+            if entry is not None:
+                self.__decoded.move_to_end(key)
+        if entry is not None:
+            try:
+                os.utime(file_path)
+                return entry
+            except OSError:
+                self.forget(key)
+                return None
+        try:
+            with open(file_path, "r", encoding="utf-8") as fil:
+                data = json.load(fil)
+            os.utime(file_path)
+        except (IOError, ValueError):
+            return None
+        return CacheEntry(data["url"], data["etag"], data["body"])
+
+    def put(self, key: str, etag: str, body: str):
+        """Saves a response under the given key and evicts old entries."""
+        name = self.__file_name(key)
+        raw = json.dumps(dict(url=key, etag=etag, body=body),
+                         ensure_ascii=False).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fil:
+            fil.write(raw)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        with self.__lock:
+            self.__sizes[name] = len(raw)
+            self.__decoded.pop(key, None)
+            self.__evict()
+
+    def remember(self, entry: CacheEntry):
+        """Keeps the entry together with its decoded body in memory."""
+        with self.__lock:
+            self.__decoded[entry.url] = entry
+            self.__decoded.move_to_end(entry.url)
+            while len(self.__decoded) > self.memory_entries:
+                self.__decoded.popitem(last=False)
+
+    def forget(self, key: str):
+        """Drops the decoded body of the given key from memory."""
+        with self.__lock:
+            self.__decoded.pop(key, None)
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with self.__lock:
+            self.__decoded.clear()
+            for name in list(self.__sizes):
+                self.__remove(name)
+
+    def __evict(self):
+        """Removes the least recently used entries until the size fits."""
+        total = sum(self.__sizes.values())
+        if total <= self.max_size:
+            return
+        by_age = sorted(self.__sizes, key=self.__last_used)
+        for name in by_age:
+            if total <= self.max_size:
+                break
+            total -= self.__sizes[name]
+            self.__remove(name)
+
+    def __last_used(self, name: str) -> float:
+        """Returns the time an entry was last used."""
+        try:
+            return os.path.getmtime(os.path.join(self.path, name))
+        except OSError:
+            return 0
+
+    def __remove(self, name: str):
+        """Deletes the file of an entry and its decoded body."""
+        del self.__sizes[name]
+        for key in [x for x in self.__decoded
+                    if self.__file_name(x) == name]:
+            del self.__decoded[key]
+        try:
+            os.remove(os.path.join(self.path, name))
+        except OSError:
+            pass
+
+    @staticmethod
+    def __file_name(key: str) -> str:
+        """Returns the file name for a given key."""
+        return "{}.json".format(hashlib.sha1(key.encode("utf-8")).hexdigest())
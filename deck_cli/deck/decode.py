@@ -0,0 +1,128 @@
+"""
+Hand-written decoders for the Stacks (including their Cards) returned by the
+Deck API. They build the data classes directly from the decoded JSON and skip
+the validation done by the marshmallow schemas. This is considerably faster
+for large responses but should only be used for read-only tasks like reports
+and dumps.
+"""
+import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from deck_cli.deck.models import NCDeckAssignedUser, NCDeckCard, NCDeckLabel
+from deck_cli.deck.models import NCDeckStack, NCDeckUser, decode_response
+
+from marshmallow.utils import from_iso_datetime
+
+
+def stacks_from_json(raw: str) -> List[NCDeckStack]:
+    """Reads a list of Stacks from a JSON string."""
+    return stacks_from_data(decode_response(raw))
+
+
+def stacks_from_data(data: List[Dict[str, Any]]) -> List[NCDeckStack]:
+    """Reads a list of Stacks from an already decoded JSON response."""
+    return [stack_from_dict(x) for x in data]
+
+
+def stack_from_dict(data: Dict[str, Any]) -> NCDeckStack:
+    """Returns a new Stack based on the decoded JSON."""
+    cards = data.get("cards")
+    return NCDeckStack(
+        title=data["title"],
+        board_id=data["boardId"],
+        deleted_at=_optional_date(data["deletedAt"]),
+        last_modified=_optional_date(data["lastModified"]),
+        cards=None if cards is None else [card_from_dict(x) for x in cards],
+        order=data["order"],
+        stack_id=data["id"],
+        etag=data["ETag"],
+    )
+
+
+def card_from_dict(data: Dict[str, Any]) -> NCDeckCard:
+    """Returns a new Card based on the decoded JSON."""
+    labels = data.get("labels")
+    assigned_users = data.get("assignedUsers")
+    duedate = data.get("duedate")
+    return NCDeckCard(
+        title=data["title"],
+        description=data["description"],
+        stack_id=data["stackId"],
+        card_type=data["type"],
+        last_modified=_optional_date(data["lastModified"]),
+        last_editor=data.get("lastEditor"),
+        created_at=_optional_date(data["createdAt"]),
+        labels=None if labels is None else [
+            label_from_dict(x) for x in labels],
+        assigned_users=None if assigned_users is None else [
+            assigned_user_from_dict(x) for x in assigned_users],
+        attachments=data.get("attachments"),
+        attachment_count=data.get("attachmentCount"),
+        owner=_owner(data["owner"]),
+        order=data["order"],
+        archived=data["archived"],
+        duedate=None if duedate is None else _iso_date(duedate),
+        deleted_at=_optional_date(data["deletedAt"]),
+        comments_unread=data["commentsUnread"],
+        card_id=data["id"],
+        etag=data["ETag"],
+        overdue=data["overdue"],
+    )
+
+
+def label_from_dict(data: Dict[str, Any]) -> NCDeckLabel:
+    """Returns a new Label based on the decoded JSON."""
+    return NCDeckLabel(
+        title=data["title"],
+        color=data["color"],
+        board_id=data["boardId"],
+        card_id=data.get("cardId"),
+        last_modified=_optional_date(data["lastModified"]),
+        label_id=data["id"],
+        etag=data["ETag"],
+    )
+
+
+def assigned_user_from_dict(data: Dict[str, Any]) -> NCDeckAssignedUser:
+    """Returns a new assigned User based on the decoded JSON."""
+    return NCDeckAssignedUser(
+        user_id=data["id"],
+        participant=user_from_dict(data["participant"]),
+        card_id=data["cardId"],
+        assignment_type=data["type"],
+    )
+
+
+def user_from_dict(data: Dict[str, Any]) -> NCDeckUser:
+    """Returns a new User based on the decoded JSON."""
+    return NCDeckUser(
+        primary_key=data["primaryKey"],
+        uid=data["uid"],
+        display_name=data["displayname"],
+        user_type=data["type"],
+    )
+
+
+def _owner(value: Union[str, Dict[str, Any]]) -> Union[str, NCDeckUser]:
+    """The owner of a Card is either given as a user name or a User."""
+    if isinstance(value, dict):
+        return user_from_dict(value)
+    return value
+
+
+def _optional_date(value: int) -> Optional[datetime.datetime]:
+    """
+    Converts a unix timestamp to a datetime object. Unset dates (given as 0 by
+    the API) are returned as None.
+    """
+    if value < 1:
+        return None
+    return datetime.datetime.fromtimestamp(value)
+
+
+def _iso_date(value: str) -> datetime.datetime:
+    """Parses a ISO 8601 date string."""
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return from_iso_datetime(value)
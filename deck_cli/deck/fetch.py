@@ -2,13 +2,23 @@
 Fetch abstracts all calls to the Nextcloud and Deck API.
 """
 
+from deck_cli.deck.cache import ResponseCache
+from deck_cli.deck.decode import stacks_from_data
 from deck_cli.deck.models import NCBoard, NCBaseBoard, NCDeckCard, NCDeckStack, NCCardPost, NCDeckAssignedUser, NCCardAssignUserRequest
+from deck_cli.deck.models import DeckException, decode_response
 
+import asyncio
 from collections.abc import Callable
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import functools
+import threading
 import xml.etree.ElementTree as ET
-from typing import List
+from typing import Any, AsyncIterator, Deque, Iterator, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 ALL_USER_IDS_URL = "/ocs/v1.php/cloud/users"
 USER_DETAILS_URL = "ocs/v1.php/cloud/users/{user_uuid}"
@@ -21,7 +31,7 @@ SINGLE_CARD_POST_URL = "boards/{board_id}/stacks/{stack_id}/cards"
 ASSIGN_USER_TO_CARD_URL = "boards/{board_id}/stacks/{stack_id}/cards/{card_id}/assignUser"
 
 
-ProgressCallback = Callable[[int, int, str], ]
+ProgressCallback = Callable[[int, int, str], None]
 """
 Called by the Fetch class before doing a request. Can be used to inform the
 user about the progress. The following parameters are provided:
@@ -40,36 +50,84 @@ class NextcloudException(Exception):
         Exception.__init__(self, "{} ({})".format(message, code))
 
 
+@dataclass
+class UserAssignment:
+    """
+    The outcome of assigning a User to a Card. Either the assigned User or the
+    error reported by the API is set.
+    """
+    user_uid: str
+    assigned_user: Optional[NCDeckAssignedUser] = None
+    error: Optional[DeckException] = None
+
+
 class Fetch:
     """
     Contains all calls to the Nextcloud and Deck API.
 
     The progress_callback can be used to display a update to the user
-    when doing multiple API calls at once.
+    when doing multiple API calls at once. The workers define how many
+    requests are allowed to run in parallel when fetching the Stacks of
+    multiple Boards.
+
+    All requests share one HTTP session which keeps the connections to the
+    server alive. The pool_size defines the number of connections kept open,
+    it defaults to the number of workers. Call close (or use the instance as
+    a context manager) to release the connections when done.
+
+    If a ResponseCache is given, GET requests are sent with the ETag of the
+    cached response and the cached body is used if the server reports the
+    resource as unchanged.
+
+    With fast_decode the Stacks are read by the hand-written decoders which
+    skip the schema validation. Only use this for read-only tasks.
     """
     base_url: str
     user: str
     password: str
     progress_callback: ProgressCallback
+    workers: int
+    session: requests.Session
+    cache: Optional[ResponseCache]
+    fast_decode: bool
 
     def __init__(
         self,
         base_url: str,
         user: str,
         password: str,
-        progress_callback: ProgressCallback = lambda *args: None
+        progress_callback: ProgressCallback = lambda *args: None,
+        workers: int = 1,
+        pool_size: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+        fast_decode: bool = False,
     ):
         self.base_url = base_url
         self.user = user
         self.password = password
         self.progress_callback = progress_callback
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.fast_decode = fast_decode
+        if pool_size is None:
+            pool_size = self.workers
+        self.session = self.__new_session(pool_size)
+
+    def __enter__(self) -> 'Fetch':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the HTTP session and all pooled connections."""
+        self.session.close()
 
     def all_boards(self) -> List[NCBoard]:
         """Returns all boards for the given user."""
         self.progress_callback(1, 1, "requests overview over all boards")
-        data = self.__send_get_request(
-            self.__deck_api_url(ALL_USER_BOARDS_URL))
-        return NCBoard.from_json(data, True)
+        data = self.__get_data(self.__deck_api_url(ALL_USER_BOARDS_URL))
+        return NCBoard.from_data(data, True)
 
     def all_boards_with_stacks(self) -> List[NCBoard]:
         """
@@ -77,9 +135,28 @@ class Fetch:
         Stacks and inserts them into the resulting data structure.
         """
         self.progress_callback(1, 0, "requests overview over all boards")
-        data = self.__send_get_request(
-            self.__deck_api_url(ALL_USER_BOARDS_URL))
-        boards = NCBoard.from_json(data, True)
+        data = self.__get_data(self.__deck_api_url(ALL_USER_BOARDS_URL))
+        boards = NCBoard.from_data(data, True)
+        self.add_stacks_to_boards(boards)
+        return boards
+
+    def add_stacks_to_boards(self, boards: List[NCBoard]):
+        """Fetches the Stacks of the given Boards and inserts them."""
+        for _ in self.iter_boards_with_stacks(boards):
+            pass
+
+    def iter_boards_with_stacks(
+        self,
+        boards: List[NCBoard],
+    ) -> Iterator[NCBoard]:
+        """
+        Fetches the Stacks of the given Boards and yields each Board (in the
+        given order) as soon as its Stacks are inserted. This allows the caller
+        to process and release one Board after another.
+        """
+        if self.workers > 1:
+            yield from self.__iter_boards_concurrently(boards)
+            return
         i: int = 1
         for board in boards:
             self.progress_callback(
@@ -87,19 +164,21 @@ class Fetch:
                 "request stacks for {} board".format(board.title))
             board.stacks = self.stacks_by_board(board.board_id)
             i += 1
-        return boards
+            yield board
 
     def board_by_id(self, board_id: int) -> NCBaseBoard:
         """Returns a board by a given board id."""
-        data = self.__send_get_request(
+        data = self.__get_data(
             self.__deck_api_url(SINGLE_BOARD_URL.format(board_id=board_id)))
-        return NCBaseBoard.from_json(data, False)
+        return NCBaseBoard.from_data(data, False)
 
     def stacks_by_board(self, board_id: int) -> List[NCDeckStack]:
         """Returns all stacks of a given board with the given id."""
-        data = self.__send_get_request(
+        data = self.__get_data(
             self.__deck_api_url(ALL_STACKS_URL.format(board_id=board_id)))
-        return NCDeckStack.from_json(data, True)
+        if self.fast_decode:
+            return stacks_from_data(data)
+        return NCDeckStack.from_data(data, True)
 
     def user_ids(self) -> List[str]:
         """
@@ -159,38 +238,137 @@ class Fetch:
         rsl = self.__send_put_request(api_url, body.dumps())
         return NCDeckAssignedUser.from_json(rsl, False)
 
+    def assign_users_to_card(
+        self,
+        board_id: int,
+        stack_id: int,
+        card_id: int,
+        user_uids: List[str],
+    ) -> List[UserAssignment]:
+        """
+        Assigns multiple Users to a card. The requests are sent in parallel by
+        a pool of workers. Errors reported by the API (e.g. a User which isn't
+        part of the Board) don't stop the other assignments, they are returned
+        in the result (in the order of the given Users).
+        """
+        def assign(user_uid: str) -> UserAssignment:
+            try:
+                return UserAssignment(user_uid, self.assign_user_to_card(
+                    board_id, stack_id, card_id, user_uid))
+            except DeckException as exc:
+                return UserAssignment(user_uid, error=exc)
+
+        if len(user_uids) < 2:
+            return [assign(x) for x in user_uids]
+        workers = min(self.workers, len(user_uids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(assign, user_uids))
+
+    def __iter_boards_concurrently(
+        self,
+        boards: List[NCBoard],
+    ) -> Iterator[NCBoard]:
+        """
+        Fetches the Stacks for the given Boards using a pool of workers. The
+        Stacks of at most as many Boards as there are workers are fetched
+        ahead of the Board yielded last. As the requests complete in an
+        arbitrary order the progress callback is called with the number of
+        already finished requests.
+        """
+        lock = threading.Lock()
+        done: int = 0
+
+        def fetch_stacks(board: NCBoard) -> NCBoard:
+            nonlocal done
+            board.stacks = self.stacks_by_board(board.board_id)
+            with lock:
+                done += 1
+                self.progress_callback(
+                    done, len(boards),
+                    "received stacks for {} board".format(board.title))
+            return board
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending: Deque[Future] = deque()
+            for board in boards:
+                pending.append(executor.submit(fetch_stacks, board))
+                if len(pending) >= self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
     def __send_get_request(self, url: str) -> str:
         """
         Calls a Nextcloud/Deck API with the given URL and returns
         the answer as a string.
         """
-        rqs = requests.get(
-            url,
-            headers=self.__request_header(),
-            auth=(self.user, self.password)
-        )
+        if self.cache is None:
+            return self.session.get(url).text
+        key = "{}@{}".format(self.user, url)
+        entry = self.cache.get(key)
+        headers = {}
+        if entry is not None:
+            headers["If-None-Match"] = entry.etag
+        rqs = self.session.get(url, headers=headers)
+        if entry is not None and rqs.status_code == 304:
+            return entry.body
+        etag = rqs.headers.get("ETag")
+        if rqs.status_code == 200 and etag is not None:
+            self.cache.put(key, etag, rqs.text)
         return rqs.text
 
+    def __get_data(self, url: str) -> Any:
+        """
+        Calls a Deck API with the given URL and returns the decoded JSON
+        answer. If the server reports a cached response as unchanged, its
+        body is only decoded if it isn't kept in memory by the cache yet. The
+        result may be shared with the cache and thus must not be altered.
+        """
+        if self.cache is None:
+            return decode_response(self.session.get(url).text)
+        key = "{}@{}".format(self.user, url)
+        entry = self.cache.get(key)
+        headers = {}
+        if entry is not None:
+            headers["If-None-Match"] = entry.etag
+        rqs = self.session.get(url, headers=headers)
+        if entry is not None and rqs.status_code == 304:
+            if entry.data is None:
+                entry.data = decode_response(entry.body)
+                self.cache.remember(entry)
+            return entry.data
+        data = decode_response(rqs.text)
+        etag = rqs.headers.get("ETag")
+        if rqs.status_code == 200 and etag is not None:
+            self.cache.put(key, etag, rqs.text)
+        return data
+
     def __send_put_request(self, url: str, data) -> str:
         """Send a PUT Request to the API with a given data body."""
-        rqs = requests.put(
-            url,
-            data=data,
-            headers=self.__request_header(),
-            auth=(self.user, self.password)
-        )
+        rqs = self.session.put(url, data=data)
         return rqs.text
 
     def __send_post_request(self, url: str, data) -> str:
         """Send a POST Request to the API with a given data body."""
-        rqs = requests.post(
-            url,
-            data=data,
-            headers=self.__request_header(),
-            auth=(self.user, self.password)
-        )
+        rqs = self.session.post(url, data=data)
         return rqs.text
 
+    def __new_session(self, pool_size: int) -> requests.Session:
+        """
+        Returns a new HTTP session with the authentication and the request
+        header for all API calls and a connection pool of the given size.
+        """
+        session = requests.Session()
+        session.auth = (self.user, self.password)
+        session.headers.update(self.__request_header())
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
     def __deck_api_url(self, postfix: str) -> str:
         """Returns the Deck API URL with a given postfix."""
         return "{}/{}/{}".format(self.base_url, DECK_APP_URL, postfix)
@@ -201,3 +379,179 @@ class Fetch:
             "OCS-APIRequest": "true",
             "Content-Type": "application/json",
         }
+
+
+class AsyncFetch:
+    """
+    Asynchronous counterpart to Fetch with the same API surface. Allows the
+    usage within an asyncio event loop.
+
+    The concurrency limits the number of requests running at the same time.
+    The requests are sent by a bounded pool of the same size using a shared
+    HTTP session. Call close (or use the instance as an async context
+    manager) when done. The optional cache and fast_decode are used as
+    described in Fetch.
+    """
+    progress_callback: ProgressCallback
+    concurrency: int
+    __fetch: Fetch
+    __executor: ThreadPoolExecutor
+
+    def __init__(
+        self,
+        base_url: str,
+        user: str,
+        password: str,
+        progress_callback: ProgressCallback = lambda *args: None,
+        concurrency: int = 4,
+        cache: Optional[ResponseCache] = None,
+        fast_decode: bool = False,
+    ):
+        self.progress_callback = progress_callback
+        self.concurrency = max(1, concurrency)
+        self.__fetch = Fetch(
+            base_url,
+            user,
+            password,
+            pool_size=self.concurrency,
+            cache=cache,
+            fast_decode=fast_decode,
+        )
+        self.__executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+    async def __aenter__(self) -> 'AsyncFetch':
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the HTTP session and stops the request pool."""
+        self.__executor.shutdown(wait=False)
+        self.__fetch.close()
+
+    async def all_boards(self) -> List[NCBoard]:
+        """Returns all boards for the given user."""
+        self.progress_callback(1, 1, "requests overview over all boards")
+        return await self.__run(self.__fetch.all_boards)
+
+    async def all_boards_with_stacks(self) -> List[NCBoard]:
+        """
+        Returns all boards for the given user, fetches for all Boards their
+        Stacks concurrently and inserts them into the resulting data
+        structure.
+        """
+        self.progress_callback(1, 0, "requests overview over all boards")
+        boards = await self.__run(self.__fetch.all_boards)
+        await self.add_stacks_to_boards(boards)
+        return boards
+
+    async def add_stacks_to_boards(self, boards: List[NCBoard]):
+        """Fetches the Stacks of the given Boards concurrently."""
+        done: int = 0
+
+        async def fetch_stacks(board: NCBoard):
+            nonlocal done
+            board.stacks = await self.stacks_by_board(board.board_id)
+            done += 1
+            self.progress_callback(
+                done, len(boards),
+                "received stacks for {} board".format(board.title))
+
+        await asyncio.gather(*[fetch_stacks(x) for x in boards])
+
+    async def iter_boards_with_stacks(
+        self,
+        boards: List[NCBoard],
+    ) -> AsyncIterator[NCBoard]:
+        """
+        Fetches the Stacks of the given Boards and yields each Board (in the
+        given order) as soon as its Stacks are inserted. The Stacks of at most
+        as many Boards as the concurrency limit are fetched ahead.
+        """
+        done: int = 0
+
+        async def fetch_stacks(board: NCBoard) -> NCBoard:
+            nonlocal done
+            board.stacks = await self.stacks_by_board(board.board_id)
+            done += 1
+            self.progress_callback(
+                done, len(boards),
+                "received stacks for {} board".format(board.title))
+            return board
+
+        pending: Deque[asyncio.Future] = deque()
+        for board in boards:
+            pending.append(asyncio.ensure_future(fetch_stacks(board)))
+            if len(pending) >= self.concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+
+    async def board_by_id(self, board_id: int) -> NCBaseBoard:
+        """Returns a board by a given board id."""
+        return await self.__run(self.__fetch.board_by_id, board_id)
+
+    async def stacks_by_board(self, board_id: int) -> List[NCDeckStack]:
+        """Returns all stacks of a given board with the given id."""
+        return await self.__run(self.__fetch.stacks_by_board, board_id)
+
+    async def user_ids(self) -> List[str]:
+        """
+        Returns a list of Nextcloud's user ids also known as user-names in the
+        web front-end.
+        """
+        return await self.__run(self.__fetch.user_ids)
+
+    async def user_mail(self, name: str) -> str:
+        """Returns the mail address of the user with the given name."""
+        return await self.__run(self.__fetch.user_mail, name)
+
+    async def add_card(
+        self,
+        board_id: int,
+        stack_id: int,
+        card: NCCardPost,
+    ) -> NCDeckCard:
+        """Adds a given card to the Deck via the API."""
+        return await self.__run(
+            self.__fetch.add_card, board_id, stack_id, card)
+
+    async def assign_user_to_card(
+        self,
+        board_id: int,
+        stack_id: int,
+        card_id: int,
+        user_uid: str
+    ) -> NCDeckAssignedUser:
+        """Assign a User with a given uid (Nextlcoud user name) to a card."""
+        return await self.__run(
+            self.__fetch.assign_user_to_card,
+            board_id, stack_id, card_id, user_uid
+        )
+
+    async def assign_users_to_card(
+        self,
+        board_id: int,
+        stack_id: int,
+        card_id: int,
+        user_uids: List[str],
+    ) -> List[UserAssignment]:
+        """
+        Assigns multiple Users to a card concurrently. Errors reported by the
+        API are returned in the result as described in Fetch.
+        """
+        async def assign(user_uid: str) -> UserAssignment:
+            try:
+                return UserAssignment(user_uid, await self.assign_user_to_card(
+                    board_id, stack_id, card_id, user_uid))
+            except DeckException as exc:
+                return UserAssignment(user_uid, error=exc)
+
+        return list(await asyncio.gather(*[assign(x) for x in user_uids]))
+
+    async def __run(self, func: Callable, *args):
+        """Runs the given blocking API call in the request pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.__executor, functools.partial(func, *args))
@@ -0,0 +1,303 @@
+"""
+A small filter language for the Cards of a Deck. A filter consists of terms
+separated by spaces, a Card has to match all of them. Each term has the form
+key:value, multiple values can be separated by commas (the Card has to match
+one of them). A leading minus negates a term. Words without a key are
+searched in the name and description of the Cards. Values containing spaces
+have to be quoted. An unquoted term with an unknown key is rejected, quote it
+to search for the text instead.
+
+    board:Backend,Frontend state:backlog,progress -label:wontfix
+    assignee:alice due:..+7d "text:release notes" archived:no
+
+The keys are board, stack, state (backlog, progress, done, none), label,
+assignee (username), archived (yes, no), text and due. The due key takes an
+interval start..end (start inclusive, end exclusive, each side optional),
+overdue, any or none. Dates are given as YYYY-MM-DD, YYYY-MM-DDTHH:MM, now,
+today or relative to now like +7d, -2w or +12h.
+
+The filter is compiled into a predicate per term. When applied to a Deck the
+most selective term which can be answered by the DeckIndex is used to find
+the candidates, only these are checked against all terms. If no term is
+selective enough all Cards are checked.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, tzinfo
+import re
+import shlex
+from typing import Callable, List, Optional, Set, Tuple, Union
+
+from deck_cli.deck.simplified import Card, CardState, Deck, DeckIndex
+from deck_cli.deck.snapshot import SnapshotDeck
+
+Predicate = Callable[[Card], bool]
+
+_STATES = {
+    "backlog": CardState.BACKLOG,
+    "progress": CardState.IN_PROGRESS,
+    "in-progress": CardState.IN_PROGRESS,
+    "done": CardState.DONE,
+    "none": None,
+}
+_BOOLEANS = {"yes": True, "true": True, "no": False, "false": False}
+_RELATIVE = re.compile(r"^([+-])(\d+)([hdw])$")
+_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+_KEYS = ("board", "stack", "state", "label", "assignee", "user", "archived",
+         "text", "due")
+_KEY = re.compile(r"^[a-z][a-z_-]*$", re.IGNORECASE)
+
+
+class FilterException(Exception):
+    """Raised when a filter expression is invalid."""
+
+
+@dataclass
+class Term:
+    """A single term of a filter."""
+    key: str
+    values: List[str]
+    negate: bool
+    predicate: Predicate
+    states: Optional[List[Optional[CardState]]] = None
+    due: Optional[Tuple[Optional[datetime], Optional[datetime]]] = None
+
+    def matches(self, card: Card) -> bool:
+        """Returns whether the Card matches the term."""
+        return self.predicate(card) != self.negate
+
+    def lookup(self, index: DeckIndex) -> Optional[List[Card]]:
+        """
+        Returns the Cards matching the term using the index, None if the term
+        can't be answered by the index. Lists of multiple values are joined,
+        thus they can contain duplicates and aren't in the order of the Deck.
+        """
+        if self.negate:
+            return None
+        if self.key == "board":
+            return _join([index.by_board.get(x, []) for x in self.values])
+        if self.key == "label":
+            return _join([index.by_label.get(x, []) for x in self.values])
+        if self.key == "assignee":
+            return _join([index.by_user.get(x, []) for x in self.values])
+        if self.key == "state":
+            return _join([index.by_state.get(x, []) for x in self.states])
+        if self.key == "due" and self.due is not None:
+            return [index.cards[i] for i in index.due_between(*self.due)]
+        return None
+
+
+class CardFilter:
+    """
+    A compiled filter expression. An empty expression matches all Cards.
+    """
+    expression: str
+    terms: List[Term]
+
+    def __init__(self, expression: str, terms: List[Term]):
+        self.expression = expression
+        self.terms = terms
+
+    @classmethod
+    def parse(
+        cls,
+        expression: str,
+        tz: tzinfo,
+        now: Optional[datetime] = None,
+    ) -> 'CardFilter':
+        """
+        Parses a filter expression. Dates without a timezone are interpreted
+        in the given timezone. Raises a FilterException if the expression is
+        invalid.
+        """
+        if now is None:
+            now = datetime.now(tz=tz)
+        terms = [_parse_term(x, quoted, tz, now)
+                 for x, quoted in _tokenize(expression)]
+        return cls(expression, terms)
+
+    def matches(self, card: Card) -> bool:
+        """Returns whether the Card matches all terms."""
+        for term in self.terms:
+            if not term.matches(card):
+                return False
+        return True
+
+    def apply(self, deck: Union[Deck, SnapshotDeck]) -> List[Card]:
+        """
+        Returns all matching Cards of the Deck in the order of the Deck. A
+        SnapshotDeck is only decoded as a whole if the filter doesn't name a
+        single assignee.
+        """
+        if isinstance(deck, SnapshotDeck):
+            username = self.__single_assignee()
+            if username is not None:
+                return [x for x in deck.user_cards(username)
+                        if self.matches(x)]
+            deck = deck.deck()
+        index = deck.index()
+        candidates: Optional[List[Card]] = None
+        ordered = True
+        for term in self.terms:
+            found = term.lookup(index)
+            if found is None:
+                continue
+            if candidates is None or len(found) < len(candidates):
+                candidates = found
+                ordered = len(term.values) == 1 and term.key != "due"
+        if candidates is None or \
+                (not ordered and len(candidates) > len(index.cards) // 4):
+            return [x for x in index.cards if self.matches(x)]
+        if ordered:
+            return [x for x in candidates if self.matches(x)]
+        keep: Set[int] = {id(x) for x in candidates if self.matches(x)}
+        return [x for x in index.cards if id(x) in keep]
+
+    def __single_assignee(self) -> Optional[str]:
+        """Returns the username if the filter requires a single assignee."""
+        for term in self.terms:
+            if term.key == "assignee" and not term.negate \
+                    and len(term.values) == 1:
+                return term.values[0]
+        return None
+
+
+def _tokenize(expression: str) -> List[Tuple[str, bool]]:
+    """
+    Splits a filter expression like a shell does. Returns the tokens together
+    with whether they were written in quotes.
+    """
+    lexer = shlex.shlex(expression, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    rsl: List[Tuple[str, bool]] = []
+    while True:
+        start = lexer.instream.tell()
+        try:
+            token = lexer.get_token()
+        except ValueError as err:
+            raise FilterException(str(err))
+        if token is None:
+            return rsl
+        head = expression[start:].lstrip()
+        if head.startswith("-"):
+            head = head[1:]
+        rsl.append((token, head[:1] in lexer.quotes))
+
+
+def _parse_term(token: str, quoted: bool, tz: tzinfo, now: datetime) -> Term:
+    """
+    Parses a single term of a filter expression. An unquoted term with an
+    unknown key raises a FilterException, a quoted one is a text search.
+    """
+    negate = token.startswith("-") and len(token) > 1
+    if negate:
+        token = token[1:]
+    key, sep, raw = token.partition(":")
+    if sep and key not in _KEYS and not quoted and _KEY.match(key):
+        raise FilterException(
+            "unknown key {}, use one of: {} (quote the term to search for "
+            "the text)".format(key, ", ".join(_KEYS)))
+    if not sep or key not in _KEYS:
+        key, raw = "text", token
+    if key == "user":
+        key = "assignee"
+    if raw == "":
+        raise FilterException("missing value for {}".format(key))
+    values = [x for x in raw.split(",") if x != ""]
+
+    if key == "board":
+        names = set(values)
+        return Term(key, values, negate, lambda x: x.board_name in names)
+    if key == "stack":
+        names = set(values)
+        return Term(key, values, negate, lambda x: x.stack_name in names)
+    if key == "label":
+        labels = set(values)
+        return Term(key, values, negate,
+                    lambda x: any(y in labels for y in x.labels))
+    if key == "assignee":
+        users = set(values)
+        return Term(key, values, negate, lambda x: any(
+            y.username in users for y in x.assigned_users))
+    if key == "state":
+        states = [_choice(key, _STATES, x.lower()) for x in values]
+        return Term(key, values, negate, lambda x: x.state in states,
+                    states=states)
+    if key == "archived":
+        if len(values) != 1:
+            raise FilterException("archived takes a single value")
+        archived = _choice(key, _BOOLEANS, values[0].lower())
+        return Term(key, values, negate, lambda x: x.archived == archived)
+    if key == "due":
+        return _due_term(raw, negate, tz, now)
+    words = [x.lower() for x in values]
+    return Term(key, values, negate, lambda x: any(
+        y in x.name.lower() or y in (x.description or "").lower()
+        for y in words))
+
+
+def _due_term(raw: str, negate: bool, tz: tzinfo, now: datetime) -> Term:
+    """Parses the value of a due term."""
+    value = raw.lower()
+    if value == "none":
+        return Term("due", [raw], negate, lambda x: x.duedate is None)
+    if value == "any":
+        return Term("due", [raw], negate, lambda x: x.duedate is not None,
+                    due=(None, None))
+    if value == "overdue":
+        start, end = None, now
+    elif ".." in value:
+        first, _, last = value.partition("..")
+        start = None if first == "" else _parse_date(first, tz, now)
+        end = None if last == "" else _parse_date(last, tz, now)
+    else:
+        raise FilterException(
+            "due takes an interval (start..end), overdue, any or none")
+
+    def predicate(card: Card) -> bool:
+        if card.duedate is None:
+            return False
+        due = card.duedate.timestamp()
+        return (start is None or due >= start.timestamp()) and \
+            (end is None or due < end.timestamp())
+    return Term("due", [raw], negate, predicate, due=(start, end))
+
+
+def _parse_date(value: str, tz: tzinfo, now: datetime) -> datetime:
+    """Parses an absolute or relative date of a due interval."""
+    if value == "now":
+        return now
+    if value == "today":
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    match = _RELATIVE.match(value)
+    if match is not None:
+        sign, amount, unit = match.groups()
+        delta = timedelta(**{_UNITS[unit]: int(amount)})
+        return now + delta if sign == "+" else now - delta
+    try:
+        date = datetime.fromisoformat(value.upper())
+    except ValueError:
+        raise FilterException("invalid date {}".format(value))
+    if date.tzinfo is None:
+        if hasattr(tz, "localize"):
+            return tz.localize(date)
+        return date.replace(tzinfo=tz)
+    return date
+
+
+def _choice(key: str, choices: dict, value: str):
+    """Returns the value for one of the given choices."""
+    if value not in choices:
+        raise FilterException("invalid value {} for {}, use one of: {}".format(
+            value, key, ", ".join(choices)))
+    return choices[value]
+
+
+def _join(lists: List[List[Card]]) -> List[Card]:
+    """Joins the given lists, a single list is returned as it is."""
+    if len(lists) == 1:
+        return lists[0]
+    rsl: List[Card] = []
+    for cards in lists:
+        rsl.extend(cards)
+    return rsl
@@ -7,16 +7,22 @@ import datetime
 import json
 from typing import List, Optional, Any, Union
 
+from deck_cli.deck.schema import schema_for
+
 from marshmallow import post_dump, pre_load
-import marshmallow_dataclass
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 
 class DeckException(Exception):
     """Catches Nextcloud API errors."""
     user_not_part_of_board = False
 
-    def __init__(self, raw: str):
-        data = json.loads(raw)
+    def __init__(self, data: dict[str, Any]):
         if data["message"] == "The user is not part of the board":
             self.user_not_part_of_board = True
         Exception.__init__(self, data["message"])
@@ -26,17 +32,30 @@ class DeckException(Exception):
 class Base:
     """
     The base class for all data classes. Provides the JSON
-    unmarshaling for all classes.
+    unmarshaling for all classes. The JSON is decoded only once (using orjson
+    if installed) and the resulting object is passed to the schema.
     """
 
     @classmethod
     def from_json(cls, raw: str, many=bool) -> 'NCBoard':
         """Reads the NCBoard from a JSON string."""
-        data = json.loads(raw)
-        if isinstance(data, dict) and "status" in data and data["status"] == 400:
-            raise DeckException(raw)
-        schema = marshmallow_dataclass.class_schema(cls)()
-        return schema.loads(raw, many=many)
+        return cls.from_data(decode_response(raw), many=many)
+
+    @classmethod
+    def from_data(cls, data: Any, many=bool) -> 'NCBoard':
+        """Reads the NCBoard from an already decoded JSON response."""
+        return schema_for(cls).load(data, many=many)
+
+
+def decode_response(raw: str) -> Any:
+    """
+    Decodes the JSON response of the Deck API. Raises a DeckException if the
+    API returned an error.
+    """
+    data = _json_loads(raw)
+    if isinstance(data, dict) and "status" in data and data["status"] == 400:
+        raise DeckException(data)
+    return data
 
 
 @dataclass
@@ -72,9 +91,8 @@ class NCDeckLabel:
     @pre_load
     def convert_date(self, data, **kwargs):
         """Converts all Unix dates to normal python datetime objects."""
-        _func_on_dict(data, _timestamp_to_optional_date,
-                      ["lastModified"])
-        return data
+        return _func_on_dict(data, _timestamp_to_optional_date,
+                             ["lastModified"])
 
 
 @dataclass
@@ -132,9 +150,8 @@ class NCDeckCard(Base):
     @pre_load
     def convert_date(self, data, **kwargs):
         """Converts all Unix dates to normal python datetime objects."""
-        _func_on_dict(data, _timestamp_to_optional_date,
-                      ["deletedAt", "lastModified", "createdAt"])
-        return data
+        return _func_on_dict(data, _timestamp_to_optional_date,
+                             ["deletedAt", "lastModified", "createdAt"])
 
 
 @dataclass
@@ -161,9 +178,8 @@ class NCDeckStack(Base):
     @pre_load
     def convert_date(self, data, **kwargs):
         """Converts all Unix dates to normal python datetime objects."""
-        _func_on_dict(data, _timestamp_to_optional_date,
-                      ["deletedAt", "lastModified"])
-        return data
+        return _func_on_dict(data, _timestamp_to_optional_date,
+                             ["deletedAt", "lastModified"])
 
 
 @dataclass
@@ -193,9 +209,8 @@ class NCBaseBoard(Base):
     @pre_load
     def convert_date(self, data, **kwargs):
         """Converts all Unix dates to normal python datetime objects."""
-        _func_on_dict(data, _timestamp_to_optional_date,
-                      ["deletedAt", "lastModified"])
-        return data
+        return _func_on_dict(data, _timestamp_to_optional_date,
+                             ["deletedAt", "lastModified"])
 
 
 @dataclass
@@ -227,8 +242,7 @@ class NCCardPost:
 
     def dumps(self):
         """Returns the content of the instance as JSON representation."""
-        schema = marshmallow_dataclass.class_schema(NCCardPost)()
-        return schema.dumps(self)
+        return schema_for(NCCardPost).dumps(self)
 
 
 @dataclass
@@ -238,8 +252,7 @@ class NCCardAssignUserRequest:
 
     def dumps(self):
         """Returns the content of the instance as JSON representation."""
-        schema = marshmallow_dataclass.class_schema(NCCardAssignUserRequest)()
-        return schema.dumps(self)
+        return schema_for(NCCardAssignUserRequest).dumps(self)
 
 
 def _func_on_dict(
@@ -247,12 +260,16 @@ def _func_on_dict(
         func: Callable[[int], Any],
         keys: List[str]
 ) -> dict[str, Any]:
-    """Applies the given function on all values with one of the given keys."""
-    for key in data:
-        if key not in keys:
-            continue
-        data[key] = func(data[key])
-    return data
+    """
+    Returns a copy of the dict with the given function applied on all values
+    with one of the given keys. The decoded response itself stays unchanged
+    as it may be shared by the ResponseCache.
+    """
+    rsl = dict(data)
+    for key in keys:
+        if key in rsl:
+            rsl[key] = func(rsl[key])
+    return rsl
 
 
 def _timestamp_to_date(value: int) -> datetime.datetime:
@@ -0,0 +1,29 @@
+"""
+Process-wide registry of the marshmallow schemas. Generating a schema for a
+data class (including all nested schemas) is expensive, thus each schema is
+only built once and then reused for all further (de-)serializations.
+"""
+import functools
+
+from marshmallow import Schema, fields
+import marshmallow_dataclass
+
+
+@functools.lru_cache(maxsize=None)
+def schema_for(cls: type) -> Schema:
+    """
+    Returns the schema instance for the given data class. The nested schemas
+    are instantiated right away instead of on the first usage.
+    """
+    schema = marshmallow_dataclass.class_schema(cls)()
+    _instantiate_nested(schema)
+    return schema
+
+
+def _instantiate_nested(schema: Schema):
+    """Instantiates all nested schemas of the given schema."""
+    for field in schema.fields.values():
+        while isinstance(field, fields.List):
+            field = field.inner
+        if isinstance(field, fields.Nested):
+            _instantiate_nested(field.schema)
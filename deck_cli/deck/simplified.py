@@ -4,17 +4,25 @@ optimized for further processing and omitting most of the
 redundancy.
 """
 
+from bisect import bisect_left
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from enum import Enum
 from itertools import chain
-from typing import Dict, List, Optional
+import sys
+from typing import Dict, Iterable, List, Optional
 
 from deck_cli.deck.models import NCBoard, NCDeckStack, NCDeckCard
 from deck_cli.deck.models import NCDeckUser, NCDeckAssignedUser
 
+_SLOTS = dict(slots=True) if sys.version_info >= (3, 10) else {}
+"""
+The simplified classes are slotted (without a per instance __dict__) to save
+memory when loading large Decks. Only supported by Python 3.10 and later.
+"""
 
-@dataclass
+
+@dataclass(**_SLOTS)
 class User:
     """A Deck user."""
     username: str
@@ -59,7 +67,7 @@ class CardState(Enum):
         return "done"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Card:
     """A Deck Card."""
     identifier: int
@@ -73,6 +81,12 @@ class Card:
     board_name: str
     stack_name: str
 
+    def __post_init__(self):
+        """Interns the names shared by many Cards to save memory."""
+        self.board_name = sys.intern(self.board_name)
+        self.stack_name = sys.intern(self.stack_name)
+        self.labels = [sys.intern(x) for x in self.labels]
+
     @classmethod
     def from_nc_card(
         cls,
@@ -107,7 +121,7 @@ class Card:
         return rsl
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Stack:
     """A Deck Stack containing Cards."""
     identifier: int
@@ -145,18 +159,20 @@ class Stack:
 
     def assigned_users(self) -> List[User]:
         """Returns all Users with Tasks assigned in this Stack."""
-        rsl: List[User] = []
-        for card in self.cards:
-            rsl = rsl + card.assigned_users
-        return list(set(rsl))
+        return list(_index_assigned_users(self.cards, {}).values())
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Board:
-    """A Deck Board."""
+    """
+    A Deck Board. The modification date and the ETag are used to detect
+    changes when updating an existing dump.
+    """
     identifier: int
     name: str
     stacks: List[Stack]
+    last_modified: Optional[datetime] = None
+    etag: Optional[str] = None
 
     @classmethod
     def from_nc_board(
@@ -176,27 +192,114 @@ class Board:
                 backlog_stacks=backlog_stacks,
                 progress_stacks=progress_stacks,
                 done_stacks=done_stacks)
-                for x in board.stacks]
+                for x in board.stacks],
+            last_modified=board.last_modified,
+            etag=board.etag,
         )
 
+    def is_outdated(self, board: NCBoard) -> bool:
+        """
+        Returns whether the given NCBoard (from the get-all-boards API call)
+        was changed since this Board was fetched.
+        """
+        if self.etag is None or self.last_modified is None:
+            return True
+        return self.etag != board.etag or \
+            self.last_modified != board.last_modified
+
     def assigned_users(self) -> List[User]:
         """Returns all Users with Tasks assigned in this Board."""
-        rsl: List[User] = []
+        index: Dict[str, User] = {}
         for stack in self.stacks:
-            rsl = rsl + stack.assigned_users()
-        return list(set(rsl))
+            _index_assigned_users(stack.cards, index)
+        return list(index.values())
 
     def cards(self) -> List[Card]:
         """Returns a list of all Cards of this board."""
         return list(chain.from_iterable([x.cards for x in self.stacks]))
 
 
+class DeckIndex:
+    """
+    Secondary indexes over all Cards of a Deck. Built in a single pass over
+    the Cards, the lists keep the order of the Cards in the Deck. The due
+    date index holds the positions of the Cards with a due date sorted by
+    it.
+    """
+    cards: List[Card]
+    by_user: Dict[str, List[Card]]
+    by_state: Dict[Optional[CardState], List[Card]]
+    by_board: Dict[str, List[Card]]
+    by_label: Dict[str, List[Card]]
+    by_duedate: List[int]
+    duedates: List[float]
+
+    def __init__(self, boards: List[Board]):
+        self.cards = []
+        self.by_user = {}
+        self.by_state = {}
+        self.by_board = {}
+        self.by_label = {}
+        for board in boards:
+            board_cards = self.by_board.setdefault(board.name, [])
+            for stack in board.stacks:
+                for card in stack.cards:
+                    self.cards.append(card)
+                    board_cards.append(card)
+                    self.by_state.setdefault(card.state, []).append(card)
+                    for user in card.assigned_users:
+                        self.by_user.setdefault(
+                            user.username, []).append(card)
+                    for label in card.labels:
+                        self.by_label.setdefault(label, []).append(card)
+        due = sorted((x.duedate.timestamp(), i)
+                     for i, x in enumerate(self.cards)
+                     if x.duedate is not None)
+        self.by_duedate = [i for _, i in due]
+        self.duedates = [x for x, _ in due]
+
+    def due_between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[int]:
+        """
+        Returns the positions (in cards) of all Cards due in the given
+        interval (start inclusive, end exclusive), sorted by the due date.
+        An unset limit means no limit. Uses a binary search on the index.
+        """
+        first = 0
+        if start is not None:
+            first = bisect_left(self.duedates, start.timestamp())
+        last = len(self.duedates)
+        if end is not None:
+            last = bisect_left(self.duedates, end.timestamp())
+        return self.by_duedate[first:last]
+
+
 @dataclass
 class Deck:
-    """All Boards of a deck combined. Also contains the users."""
+    """
+    All Boards of a deck combined. Also contains the users. All Cards share
+    the User instances of the Deck. Lookups of Cards use the DeckIndex which
+    is built on first use, thus the Deck must not be altered afterwards. The
+    Deck isn't slotted as it holds the index as a (non-field) attribute.
+    """
     users: List[User]
     boards: List[Board]
 
+    def __post_init__(self):
+        """
+        Replaces the assigned Users of all Cards by the User instances of the
+        Deck, Users missing in the Deck are added.
+        """
+        index: Dict[str, User] = {x.username: x for x in self.users}
+        for board in self.boards:
+            for stack in board.stacks:
+                _index_assigned_users(stack.cards, index, share=True)
+        self.users = list(index.values())
+        self.__index: Optional[DeckIndex] = None
+
     @classmethod
     def from_nc_boards(
             cls,
@@ -206,35 +309,79 @@ class Deck:
             done_stacks: List[str]
     ) -> 'Deck':
         """Returns a new Deck instance from a list of NCBoards."""
-        boards = [Board.from_nc_board(
+        return cls.from_boards([Board.from_nc_board(
             x,
             backlog_stacks,
             progress_stacks,
             done_stacks) for x in boards
-        ]
-
-        users: List[User] = []
-        for board in boards:
-            users = users + board.assigned_users()
+        ])
 
+    @classmethod
+    def from_boards(cls, boards: List[Board]) -> 'Deck':
+        """
+        Returns a new Deck instance containing the given Boards. The Users are
+        collected in a single pass over all Cards.
+        """
         return Deck(
-            users=list(set(users)),
+            users=[],
             boards=boards,
         )
 
+    def index(self) -> DeckIndex:
+        """Returns the index of the Cards, builds it on the first call."""
+        if self.__index is None:
+            self.__index = DeckIndex(self.boards)
+        return self.__index
+
     def cards(self) -> List[Card]:
         """Returns a list of all Cards in all Boards."""
-        return list(chain.from_iterable([x.cards() for x in self.boards]))
+        return list(self.index().cards)
+
+    def user_cards(self, username: str) -> List[Card]:
+        """Returns all Cards assigned to the User with the given username."""
+        return list(self.index().by_user.get(username, []))
+
+    def state_cards(self, state: Optional[CardState]) -> List[Card]:
+        """Returns all Cards with the given state."""
+        return list(self.index().by_state.get(state, []))
+
+    def board_cards(self, name: str) -> List[Card]:
+        """Returns all Cards of the Board with the given name."""
+        return list(self.index().by_board.get(name, []))
+
+    def label_cards(self, label: str) -> List[Card]:
+        """Returns all Cards with the given label."""
+        return list(self.index().by_label.get(label, []))
 
     def overdue_cards(self) -> List[Card]:
-        """Returns all Cards which are overdue and not in a done Stack."""
-        cards = self.cards()
-        now = datetime.now(tz=timezone.utc)
-        return [card for card in cards if card.duedate
-                is not None and card.duedate < now]
+        """
+        Returns all Cards which are overdue and not in a done Stack. The Cards
+        keep their order in the Deck.
+        """
+        index = self.index()
+        overdue = index.due_between(end=datetime.now(tz=timezone.utc))
+        return [index.cards[i] for i in sorted(overdue)
+                if index.cards[i].state != CardState.DONE]
+
+    def due_cards(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_done: bool = False,
+    ) -> List[Card]:
+        """
+        Returns the Cards due in the given interval (start inclusive, end
+        exclusive, None for no limit) sorted by their due date. Cards in a
+        done Stack are omitted unless include_done is set.
+        """
+        index = self.index()
+        cards = [index.cards[i] for i in index.due_between(start, end)]
+        if include_done:
+            return cards
+        return [x for x in cards if x.state != CardState.DONE]
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class UserWithCards(User):
     """
     A User representation containing all cards for the given User. The cards
@@ -260,19 +407,37 @@ class UserWithCards(User):
         """
         Returns a list of UserWithCards based on a (simplified) Deck object.
         """
-        rsl: Dict[str, 'UserWithCards'] = {}
+        rsl: List['UserWithCards'] = []
         for user in deck.users:
-            rsl[user.username] = UserWithCards(user)
-
-        cards = deck.cards()
-        for card in cards:
-            for usr in card.assigned_users:
+            usr = UserWithCards(user)
+            for card in deck.user_cards(user.username):
                 if card.state == CardState.BACKLOG:
-                    rsl[usr.username].backlog_cards.append(card)
+                    usr.backlog_cards.append(card)
                 elif card.state == CardState.IN_PROGRESS:
-                    rsl[usr.username].progress_cards.append(card)
+                    usr.progress_cards.append(card)
                 elif card.state == CardState.DONE:
-                    rsl[usr.username].done_cards.append(card)
+                    usr.done_cards.append(card)
                 else:
-                    rsl[usr.username].other_cards.append(card)
-        return list(rsl.values())
+                    usr.other_cards.append(card)
+            rsl.append(usr)
+        return rsl
+
+
+def _index_assigned_users(
+    cards: Iterable[Card],
+    index: Dict[str, User],
+    share: bool = False,
+) -> Dict[str, User]:
+    """
+    Adds the Users assigned to the given Cards to the index (keyed by the
+    username) and returns it. If share is set, the Users of the Cards are
+    replaced by the instances in the index.
+    """
+    for card in cards:
+        for user in card.assigned_users:
+            if user.username not in index:
+                index[user.username] = user
+        if share:
+            card.assigned_users = [index[x.username]
+                                   for x in card.assigned_users]
+    return index
@@ -0,0 +1,552 @@
+"""
+Compact binary snapshot format for the simplified Deck. This is an
+alternative to the YAML dump which is considerably faster to write and read.
+
+A snapshot starts with a header (magic and version) followed by one record
+per Board, each containing its Stacks and their Cards. Names repeated all
+over the Deck (Boards, Stacks, labels and Users) are stored once in a string
+table and referenced by their index. The file ends with a footer and the
+offset of this footer. All numbers are little-endian.
+
+Besides the string table and the Users the footer contains an index of the
+records: The offsets of all Boards, Stacks and Cards, for each Card the
+fields needed to filter them (state, due date), for each User the Cards
+assigned to them and the Cards with a due date sorted by it. Thus a
+memory-mapped snapshot can be opened as a SnapshotDeck which only decodes the
+records actually needed.
+"""
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+import mmap
+import struct
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from deck_cli.deck.simplified import Board, Card, CardState, Deck, Stack, User
+
+MAGIC = b"DECKSNAP"
+VERSION = 4
+
+_HEADER = struct.Struct("<8sH")
+_TRAILER = struct.Struct("<Q8s")
+_BOARD = struct.Struct("<qIiI")
+_STACK = struct.Struct("<qII")
+_CARD = struct.Struct("<qb?HH")
+_DATE = struct.Struct("<bqi")
+_U32 = struct.Struct("<I")
+_USER = struct.Struct("<II")
+_BOARD_ENTRY = struct.Struct("<QI")
+_STACK_ENTRY = struct.Struct("<QII")
+_CARD_ENTRY = struct.Struct("<QIb?bq")
+_DUE_ENTRY = struct.Struct("<qI")
+
+_NONE = 0xFFFFFFFF
+_NO_DATE = 0
+_NAIVE_DATE = 1
+_AWARE_DATE = 2
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_STATES = {None: -1, CardState.BACKLOG: 0,
+           CardState.IN_PROGRESS: 1, CardState.DONE: 2}
+_STATES_BY_CODE = {value: key for key, value in _STATES.items()}
+
+Buffer = Union[bytes, mmap.mmap]
+"""The content of a snapshot file, typically a memory-mapped file."""
+
+
+class SnapshotException(Exception):
+    """Raised when a snapshot cannot be read."""
+
+
+def is_snapshot(data: Buffer) -> bool:
+    """Returns whether the given data starts like a snapshot."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+class SnapshotWriter:
+    """
+    Writes a snapshot to a binary file. The Boards are written as they are
+    added, the footer is written on close.
+    """
+    __file: BinaryIO
+    __offset: int
+    __strings: Dict[str, int]
+    __users: Dict[str, int]
+    __user_names: List[Tuple[int, int]]
+    __user_cards: List[array]
+    __boards: bytearray
+    __stacks: bytearray
+    __cards: bytearray
+    __due: List[Tuple[int, int]]
+    __board_count: int
+    __stack_count: int
+    __card_count: int
+
+    def __init__(self, fil: BinaryIO):
+        self.__file = fil
+        self.__offset = 0
+        self.__strings = {}
+        self.__users = {}
+        self.__user_names = []
+        self.__user_cards = []
+        self.__boards = bytearray()
+        self.__stacks = bytearray()
+        self.__cards = bytearray()
+        self.__due = []
+        self.__board_count = 0
+        self.__stack_count = 0
+        self.__card_count = 0
+        self.__write(_HEADER.pack(MAGIC, VERSION))
+
+    def add_board(self, board: Board):
+        """Appends the record of a Board including all its Stacks."""
+        name = self.__string(board.name)
+        self.__boards += _BOARD_ENTRY.pack(self.__offset, name)
+        etag = -1 if board.etag is None else self.__string(board.etag)
+        self.__write(_BOARD.pack(
+            board.identifier,
+            name,
+            etag,
+            len(board.stacks),
+        ))
+        self.__write(_pack_date(board.last_modified))
+        for stack in board.stacks:
+            self.__add_stack(stack)
+        self.__board_count += 1
+
+    def add_users(self, users: List[User]):
+        """
+        Adds the given Users to the User table. Users added before the first
+        Board keep their order in the snapshot.
+        """
+        for user in users:
+            self.__user(user)
+
+    def close(self, users: Optional[List[User]] = None):
+        """
+        Writes the footer. The given Users are added to the Users referenced
+        by the Cards.
+        """
+        self.add_users(users or [])
+        footer_offset = self.__offset
+        parts: List[bytes] = [_U32.pack(len(self.__strings))]
+        for value in self.__strings:
+            parts.append(_pack_str(value))
+        parts.append(_U32.pack(len(self.__user_names)))
+        for username, full_name in self.__user_names:
+            parts.append(_USER.pack(username, full_name))
+        for cards in self.__user_cards:
+            parts.append(_U32.pack(len(cards)))
+            parts.append(cards.tobytes())
+        parts.append(_U32.pack(self.__board_count))
+        parts.append(bytes(self.__boards))
+        parts.append(_U32.pack(self.__stack_count))
+        parts.append(bytes(self.__stacks))
+        parts.append(_U32.pack(self.__card_count))
+        parts.append(bytes(self.__cards))
+        parts.append(_U32.pack(len(self.__due)))
+        parts.extend(_DUE_ENTRY.pack(*x) for x in sorted(self.__due))
+        parts.append(_TRAILER.pack(footer_offset, MAGIC))
+        self.__write(b"".join(parts))
+
+    def __add_stack(self, stack: Stack):
+        """Appends the record of a Stack including all its Cards."""
+        name = self.__string(stack.name)
+        self.__stacks += _STACK_ENTRY.pack(
+            self.__offset, self.__board_count, name)
+        self.__write(_STACK.pack(stack.identifier, name, len(stack.cards)))
+        records: List[bytes] = []
+        offset = self.__offset
+        for card in stack.cards:
+            kind, _, _ = _date_fields(card.duedate)
+            due = _due_key(card.duedate)
+            if kind != _NO_DATE:
+                self.__due.append((due, self.__card_count))
+            self.__cards += _CARD_ENTRY.pack(
+                offset,
+                self.__stack_count,
+                _STATES[card.state],
+                card.archived,
+                kind,
+                due,
+            )
+            record = self.__pack_card(card)
+            records.append(record)
+            offset += len(record)
+            self.__card_count += 1
+        self.__write(b"".join(records))
+        self.__stack_count += 1
+
+    def __pack_card(self, card: Card) -> bytes:
+        """Returns the record of a Card."""
+        users = [self.__user(x) for x in card.assigned_users]
+        for user in users:
+            self.__user_cards[user].append(self.__card_count)
+        return b"".join([
+            _CARD.pack(
+                card.identifier,
+                _STATES[card.state],
+                card.archived,
+                len(card.labels),
+                len(users),
+            ),
+            _pack_date(card.duedate),
+            b"".join(_U32.pack(self.__string(x)) for x in card.labels),
+            b"".join(_U32.pack(x) for x in users),
+            _pack_str(card.name),
+            _pack_str(card.description),
+        ])
+
+    def __string(self, value: str) -> int:
+        """Returns the index of a string in the string table."""
+        if value not in self.__strings:
+            self.__strings[value] = len(self.__strings)
+        return self.__strings[value]
+
+    def __user(self, user: User) -> int:
+        """Returns the index of a User in the User table."""
+        if user.username not in self.__users:
+            self.__users[user.username] = len(self.__user_names)
+            self.__user_names.append(
+                (self.__string(user.username), self.__string(user.full_name)))
+            self.__user_cards.append(array("I"))
+        return self.__users[user.username]
+
+    def __write(self, data: bytes):
+        """Writes to the file and keeps track of the offset."""
+        self.__file.write(data)
+        self.__offset += len(data)
+
+
+def write_snapshot(deck: Deck, fil: BinaryIO):
+    """Writes the given Deck as a snapshot to a binary file."""
+    writer = SnapshotWriter(fil)
+    writer.add_users(deck.users)
+    for board in deck.boards:
+        writer.add_board(board)
+    writer.close(deck.users)
+
+
+class SnapshotDeck:
+    """
+    Read access to a snapshot. Provides the same interface as the Deck but
+    only decodes the records which are actually needed by using the index in
+    the footer. Keep the instance open as long as it's used if the buffer is
+    a memory-mapped file.
+    """
+    users: List[User]
+    __data: Buffer
+    __strings: List[str]
+    __user_cards: Dict[str, Tuple[int, int]]
+    __boards: List[Tuple[int, int]]
+    __stacks: List[Tuple[int, int, int]]
+    __cards: memoryview
+    __due: memoryview
+    __decoded: Optional[List[Board]]
+
+    def __init__(self, data: Buffer):
+        if not is_snapshot(data):
+            raise SnapshotException("not a deck-cli snapshot")
+        if len(data) < _HEADER.size + _TRAILER.size:
+            raise SnapshotException("snapshot is incomplete")
+        _, version = _HEADER.unpack_from(data, 0)
+        if version != VERSION:
+            raise SnapshotException(
+                "unsupported snapshot version {}, please create the dump "
+                "again".format(version))
+        footer_offset, magic = _TRAILER.unpack_from(
+            data, len(data) - _TRAILER.size)
+        if magic != MAGIC:
+            raise SnapshotException("snapshot is incomplete")
+        self.__data = data
+        self.__decoded = None
+        try:
+            self.__read_footer(footer_offset)
+        except (struct.error, IndexError, UnicodeDecodeError) as err:
+            raise SnapshotException("snapshot is corrupt ({})".format(err))
+
+    def __read_footer(self, pos: int):
+        """Reads the string table, the Users and the index of the records."""
+        data = self.__data
+        self.__strings = []
+        count, pos = _unpack_u32(data, pos)
+        for _ in range(count):
+            value, pos = _unpack_str(data, pos)
+            self.__strings.append(value)
+        self.users = []
+        count, pos = _unpack_u32(data, pos)
+        for _ in range(count):
+            username, full_name = _USER.unpack_from(data, pos)
+            pos += _USER.size
+            self.users.append(
+                User(self.__strings[username], self.__strings[full_name]))
+        self.__user_cards = {}
+        for user in self.users:
+            count, pos = _unpack_u32(data, pos)
+            self.__user_cards[user.username] = (pos, count)
+            pos += count * _U32.size
+        count, pos = _unpack_u32(data, pos)
+        self.__boards = list(_BOARD_ENTRY.iter_unpack(
+            data[pos:pos + count * _BOARD_ENTRY.size]))
+        pos += count * _BOARD_ENTRY.size
+        count, pos = _unpack_u32(data, pos)
+        self.__stacks = list(_STACK_ENTRY.iter_unpack(
+            data[pos:pos + count * _STACK_ENTRY.size]))
+        pos += count * _STACK_ENTRY.size
+        count, pos = _unpack_u32(data, pos)
+        self.__cards = memoryview(data)[pos:pos + count * _CARD_ENTRY.size]
+        pos += count * _CARD_ENTRY.size
+        count, pos = _unpack_u32(data, pos)
+        self.__due = memoryview(data)[pos:pos + count * _DUE_ENTRY.size]
+
+    def close(self):
+        """Releases the underlying buffer."""
+        self.__cards.release()
+        self.__due.release()
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+
+    @property
+    def boards(self) -> List[Board]:
+        """Returns all Boards, decodes the whole snapshot on first access."""
+        if self.__decoded is None:
+            self.__decoded = [self.__board(x) for x, _ in self.__boards]
+        return self.__decoded
+
+    def deck(self) -> Deck:
+        """Returns the content of the snapshot as a (fully decoded) Deck."""
+        return Deck(users=self.users, boards=self.boards)
+
+    def cards(self) -> List[Card]:
+        """Returns a list of all Cards in all Boards."""
+        return list(chain.from_iterable([x.cards() for x in self.boards]))
+
+    def overdue_cards(self) -> List[Card]:
+        """
+        Returns all Cards which are overdue and not in a done Stack. Only the
+        overdue Cards are decoded.
+        """
+        now = datetime.now(tz=timezone.utc)
+        overdue = [x for x in self.__due_between(None, now)
+                   if self.__state(x) != CardState.DONE]
+        return [self.__card_at(x) for x in sorted(overdue)]
+
+    def due_cards(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_done: bool = False,
+    ) -> List[Card]:
+        """
+        Returns the Cards due in the given interval (start inclusive, end
+        exclusive, None for no limit) sorted by their due date. Cards in a
+        done Stack are omitted unless include_done is set. Only these Cards
+        are decoded.
+        """
+        return [self.__card_at(x) for x in self.__due_between(start, end)
+                if include_done or self.__state(x) != CardState.DONE]
+
+    def user_cards(self, username: str) -> List[Card]:
+        """
+        Returns all Cards assigned to the User with the given username. Only
+        these Cards are decoded.
+        """
+        if username not in self.__user_cards:
+            return []
+        pos, count = self.__user_cards[username]
+        ordinals = struct.unpack_from("<{}I".format(count), self.__data, pos)
+        return [self.__card_at(x) for x in ordinals]
+
+    def __due_between(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+    ) -> List[int]:
+        """
+        Returns the ordinals of the Cards due in the given interval sorted by
+        the due date. Uses a binary search on the due date index.
+        """
+        dates = _DueDates(self.__due)
+        first = 0
+        if start is not None:
+            first = bisect_left(dates, _due_key(start))
+        last = len(dates)
+        if end is not None:
+            last = bisect_left(dates, _due_key(end))
+        return [ordinal for _, ordinal in _DUE_ENTRY.iter_unpack(
+            self.__due[first * _DUE_ENTRY.size:last * _DUE_ENTRY.size])]
+
+    def __state(self, ordinal: int) -> Optional[CardState]:
+        """Returns the state of the Card with the given ordinal."""
+        _, _, state, _, _, _ = _CARD_ENTRY.unpack_from(
+            self.__cards, ordinal * _CARD_ENTRY.size)
+        return _STATES_BY_CODE[state]
+
+    def __card_at(self, ordinal: int) -> Card:
+        """Decodes the Card with the given ordinal."""
+        offset, stack, _, _, _, _ = _CARD_ENTRY.unpack_from(
+            self.__cards, ordinal * _CARD_ENTRY.size)
+        return self.__card(offset, stack)
+
+    def __board(self, pos: int) -> Board:
+        """Decodes the Board record at the given position."""
+        identifier, name, etag, stack_count = \
+            _BOARD.unpack_from(self.__data, pos)
+        last_modified, pos = _unpack_date(self.__data, pos + _BOARD.size)
+        stacks: List[Stack] = []
+        for _ in range(stack_count):
+            stack, pos = self.__stack(pos, self.__strings[name])
+            stacks.append(stack)
+        return Board(
+            identifier=identifier,
+            name=self.__strings[name],
+            stacks=stacks,
+            last_modified=last_modified,
+            etag=None if etag == -1 else self.__strings[etag],
+        )
+
+    def __stack(self, pos: int, board_name: str) -> Tuple[Stack, int]:
+        """Decodes a Stack record and returns it with the end position."""
+        identifier, name, card_count = _STACK.unpack_from(self.__data, pos)
+        pos += _STACK.size
+        stack_name = self.__strings[name]
+        cards: List[Card] = []
+        for _ in range(card_count):
+            card, pos = _unpack_card(
+                self.__data, pos, self.__strings, self.users,
+                board_name, stack_name)
+            cards.append(card)
+        return Stack(identifier=identifier, name=stack_name, cards=cards), pos
+
+    def __card(self, pos: int, stack: int) -> Card:
+        """Decodes a single Card record of the Stack with the given ordinal."""
+        _, board, stack_name = self.__stacks[stack]
+        _, board_name = self.__boards[board]
+        card, _ = _unpack_card(
+            self.__data, pos, self.__strings, self.users,
+            self.__strings[board_name], self.__strings[stack_name])
+        return card
+
+
+class _DueDates:
+    """
+    Sequence of the dates in the due date index of a snapshot. Used for the
+    binary search without decoding the whole index.
+    """
+    __data: memoryview
+
+    def __init__(self, data: memoryview):
+        self.__data = data
+
+    def __len__(self) -> int:
+        return len(self.__data) // _DUE_ENTRY.size
+
+    def __getitem__(self, index: int) -> int:
+        due, _ = _DUE_ENTRY.unpack_from(self.__data, index * _DUE_ENTRY.size)
+        return due
+
+
+def read_snapshot(data: Buffer) -> Deck:
+    """Reads a Deck from the content of a snapshot file."""
+    return SnapshotDeck(data).deck()
+
+
+def _unpack_card(
+    data: Buffer,
+    pos: int,
+    strings: List[str],
+    users: List[User],
+    board_name: str,
+    stack_name: str,
+) -> Tuple[Card, int]:
+    """Reads a Card record and returns it with the end position."""
+    identifier, state, archived, label_count, user_count = \
+        _CARD.unpack_from(data, pos)
+    duedate, pos = _unpack_date(data, pos + _CARD.size)
+    labels = struct.unpack_from("<{}I".format(label_count), data, pos)
+    pos += label_count * _U32.size
+    assigned = struct.unpack_from("<{}I".format(user_count), data, pos)
+    pos += user_count * _U32.size
+    name, pos = _unpack_str(data, pos)
+    description, pos = _unpack_str(data, pos)
+    return Card(
+        identifier=identifier,
+        name=name,
+        description=description,
+        labels=[strings[x] for x in labels],
+        assigned_users=[users[x] for x in assigned],
+        duedate=duedate,
+        state=_STATES_BY_CODE[state],
+        archived=archived,
+        board_name=board_name,
+        stack_name=stack_name,
+    ), pos
+
+
+def _unpack_u32(data: Buffer, pos: int) -> Tuple[int, int]:
+    """Unpacks an unsigned integer and returns it with the end position."""
+    value, = _U32.unpack_from(data, pos)
+    return value, pos + _U32.size
+
+
+def _pack_str(value: Optional[str]) -> bytes:
+    """Packs a string prefixed by its length, None is allowed."""
+    if value is None:
+        return _U32.pack(_NONE)
+    raw = value.encode("utf-8")
+    return _U32.pack(len(raw)) + raw
+
+
+def _unpack_str(data: Buffer, pos: int) -> Tuple[Optional[str], int]:
+    """Unpacks a string and returns it with the end position."""
+    length, pos = _unpack_u32(data, pos)
+    if length == _NONE:
+        return None, pos
+    return str(data[pos:pos + length], "utf-8"), pos + length
+
+
+def _date_fields(value: Optional[datetime]) -> Tuple[int, int, int]:
+    """
+    Returns the kind of a optional date, the microseconds since the epoch and
+    the UTC offset in seconds (for dates with a timezone).
+    """
+    if value is None:
+        return _NO_DATE, 0, 0
+    if value.tzinfo is None:
+        return _NAIVE_DATE, (value - _EPOCH) // timedelta(microseconds=1), 0
+    return (
+        _AWARE_DATE,
+        (value - _EPOCH_UTC) // timedelta(microseconds=1),
+        value.utcoffset() // timedelta(seconds=1),
+    )
+
+
+def _due_key(value: Optional[datetime]) -> int:
+    """
+    Returns the key of a date in the due date index: the microseconds since
+    the epoch. Naive dates are interpreted in the local timezone like the
+    DeckIndex does.
+    """
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return (value - _EPOCH_UTC) // timedelta(microseconds=1)
+
+
+def _pack_date(value: Optional[datetime]) -> bytes:
+    """Packs a optional date."""
+    return _DATE.pack(*_date_fields(value))
+
+
+def _unpack_date(data: Buffer, pos: int) -> Tuple[Optional[datetime], int]:
+    """Unpacks a date and returns it with the end position."""
+    kind, micros, offset = _DATE.unpack_from(data, pos)
+    pos += _DATE.size
+    if kind == _NO_DATE:
+        return None, pos
+    if kind == _NAIVE_DATE:
+        return _EPOCH + timedelta(microseconds=micros), pos
+    tz = timezone(timedelta(seconds=offset))
+    return (_EPOCH_UTC + timedelta(microseconds=micros)).astimezone(tz), pos
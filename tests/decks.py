@@ -0,0 +1,114 @@
+"""
+Small simplified Decks for the tests together with helpers to write them as
+snapshot and read them back.
+"""
+from datetime import datetime, timedelta, timezone
+import io
+from typing import List, Optional, Sequence
+
+from deck_cli.cli.fetch import load_deck_from_file
+from deck_cli.deck.simplified import Board, Card, CardState, Deck, Stack, User
+from deck_cli.deck.snapshot import SnapshotDeck, write_snapshot
+
+ALICE = User("alice", "Alice")
+BOB = User("bob", "Bob")
+CAROL = User("carol", "Carol")
+NOW = datetime.now(tz=timezone.utc).replace(microsecond=0)
+CET = timezone(timedelta(hours=1))
+
+
+def card(
+    identifier: int,
+    state: Optional[CardState],
+    duedate: Optional[datetime] = None,
+    users: Sequence[User] = (),
+    labels: Sequence[str] = (),
+    description: Optional[str] = "",
+    archived: bool = False,
+) -> Card:
+    """A Card, the names of the Board and Stack are set by board()."""
+    return Card(
+        identifier=identifier,
+        name="Card {}".format(identifier),
+        description=description,
+        labels=list(labels),
+        assigned_users=[User(x.username, x.full_name) for x in users],
+        duedate=duedate,
+        state=state,
+        archived=archived,
+        board_name="",
+        stack_name="",
+    )
+
+
+def board(identifier: int, name: str, stacks: List[Stack]) -> Board:
+    """A Board, sets the names of the Board and Stack of its Cards."""
+    for stack in stacks:
+        for item in stack.cards:
+            item.board_name = name
+            item.stack_name = stack.name
+    return Board(
+        identifier=identifier,
+        name=name,
+        stacks=stacks,
+        last_modified=NOW - timedelta(days=identifier),
+        etag="board-{}".format(identifier),
+    )
+
+
+def sample_deck() -> Deck:
+    """
+    A Deck with naive and aware due dates (overdue and upcoming), Cards
+    without due date or description, a Board with an empty Stack, a Board
+    without Stacks and a User without Cards.
+    """
+    naive_now = NOW.astimezone().replace(tzinfo=None)
+    return Deck(users=[CAROL], boards=[
+        board(1, "Backend", [
+            Stack(10, "Backlog", [
+                card(1, CardState.BACKLOG, NOW - timedelta(days=2),
+                     [ALICE], ["bug"]),
+                card(2, CardState.BACKLOG, naive_now + timedelta(days=3),
+                     [ALICE, BOB], description=None),
+                card(3, CardState.BACKLOG, labels=["bug", "docs"]),
+            ]),
+            Stack(11, "In Progress", [
+                card(4, CardState.IN_PROGRESS,
+                     (NOW + timedelta(hours=5)).astimezone(CET), [BOB]),
+                card(5, CardState.IN_PROGRESS,
+                     naive_now - timedelta(hours=1), archived=True),
+            ]),
+            Stack(12, "Done", [
+                card(6, CardState.DONE, NOW - timedelta(days=1), [ALICE]),
+            ]),
+        ]),
+        board(2, "Frontend", [
+            Stack(20, "Backlog", []),
+            Stack(21, "Ideas", [
+                card(7, None, NOW + timedelta(days=30), [BOB], ["docs"]),
+                card(8, None, description="Ünïcode"),
+            ]),
+        ]),
+        board(3, "Nothing", []),
+    ])
+
+
+def empty_deck() -> Deck:
+    """A Deck without Boards and Users."""
+    return Deck(users=[], boards=[])
+
+
+def snapshot_bytes(deck: Deck) -> bytes:
+    """Returns the Deck written as snapshot."""
+    fil = io.BytesIO()
+    write_snapshot(deck, fil)
+    return fil.getvalue()
+
+
+def snapshot_of(deck: Deck) -> SnapshotDeck:
+    """Writes the Deck as snapshot and opens it again as SnapshotDeck."""
+    fil = io.BytesIO(snapshot_bytes(deck))
+    fil.name = "deck.snapshot"
+    rsl = load_deck_from_file(fil)
+    assert isinstance(rsl, SnapshotDeck)
+    return rsl
@@ -0,0 +1,81 @@
+"""
+A stand-in for the HTTP session of Fetch. Serves the Boards and Stacks of
+tests/payloads.py, answers conditional requests and records all requests.
+"""
+import json
+import re
+import threading
+from typing import Dict, List, Optional
+
+import payloads
+
+STACKS_URL = re.compile(r"/boards/(\d+)/stacks$")
+
+
+class FakeResponse:
+    """The parts of requests.Response used by Fetch."""
+
+    def __init__(self, status_code: int, text: str, etag: Optional[str]):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {} if etag is None else {"ETag": etag}
+
+
+class FakeSession:
+    """
+    Serves the given number of Boards with the given number of Cards per
+    Stack. A Board can be changed with update() which renames its Cards and
+    changes the ETags.
+    """
+    requests: List[str]
+    not_modified: List[str]
+    __boards: Dict[int, dict]
+    __cards: int
+    __revisions: Dict[int, int]
+    __lock: threading.Lock
+
+    def __init__(self, boards: int, cards_per_stack: int):
+        self.requests = []
+        self.not_modified = []
+        self.__boards = {x: payloads.board(x) for x in range(1, boards + 1)}
+        self.__cards = cards_per_stack
+        self.__revisions = {x: 0 for x in self.__boards}
+        self.__lock = threading.Lock()
+
+    def update(self, board_id: int):
+        """Marks a Board as changed."""
+        self.__revisions[board_id] += 1
+        board = self.__boards[board_id]
+        board["ETag"] = "board-{}-{}".format(
+            board_id, self.__revisions[board_id])
+        board["lastModified"] += 1
+
+    def stacks_requests(self) -> List[int]:
+        """Returns the ids of the Boards whose Stacks were requested."""
+        return [int(STACKS_URL.search(x).group(1)) for x in self.requests
+                if STACKS_URL.search(x)]
+
+    def get(self, url: str, headers: Optional[dict] = None) -> FakeResponse:
+        with self.__lock:
+            self.requests.append(url)
+        match = STACKS_URL.search(url)
+        if match is None:
+            body = json.dumps(list(self.__boards.values()))
+            etag = "boards-{}".format(sum(self.__revisions.values()))
+        else:
+            board_id = int(match.group(1))
+            revision = self.__revisions[board_id]
+            data = payloads.stacks(board_id, self.__cards)
+            if revision:
+                for card in [y for x in data for y in x.get("cards", [])]:
+                    card["title"] = "{} v{}".format(card["title"], revision)
+            body = json.dumps(data)
+            etag = "stacks-{}-{}".format(board_id, revision)
+        if headers and headers.get("If-None-Match") == etag:
+            with self.__lock:
+                self.not_modified.append(url)
+            return FakeResponse(304, "", etag)
+        return FakeResponse(200, body, etag)
+
+    def close(self):
+        pass
@@ -0,0 +1,138 @@
+"""
+Builds synthetic responses of the Deck API for the tests. The payloads cover
+the variations seen in practice: Cards with and without due date, labels and
+assigned Users, archived and deleted Cards and owners given either as user
+name or as User object.
+"""
+import json
+from typing import Any, Dict, List
+
+TIMESTAMP = 1610000000
+
+
+def user(uid: str) -> Dict[str, Any]:
+    """A User as embedded in Boards and Cards."""
+    return {
+        "primaryKey": uid,
+        "uid": uid,
+        "displayname": uid.title(),
+        "type": 0,
+    }
+
+
+def label(board_id: int, label_id: int, card_id=None) -> Dict[str, Any]:
+    """A label of a Board or a Card."""
+    return {
+        "title": "label-{}".format(label_id),
+        "color": "31CC7C",
+        "boardId": board_id,
+        "cardId": card_id,
+        "lastModified": TIMESTAMP,
+        "id": label_id,
+        "ETag": "label-{}".format(label_id),
+    }
+
+
+def card(board_id: int, stack_id: int, card_id: int) -> Dict[str, Any]:
+    """
+    A Card, its optional fields vary with the id. Every third Card has no due
+    date, every fourth no labels, every fifth no assigned Users, every
+    seventh is archived and every eleventh deleted.
+    """
+    return {
+        "title": "Card {}".format(card_id),
+        "description": "Description of card {}".format(card_id),
+        "stackId": stack_id,
+        "type": "plain",
+        "lastModified": TIMESTAMP + card_id,
+        "lastEditor": None,
+        "createdAt": TIMESTAMP,
+        "labels": [] if card_id % 4 == 0 else [
+            label(board_id, card_id % 3 + 1, card_id)],
+        "assignedUsers": [] if card_id % 5 == 0 else [{
+            "id": card_id,
+            "participant": user("user{}".format(card_id % 6)),
+            "cardId": card_id,
+            "type": 0,
+        }],
+        "attachments": None,
+        "attachmentCount": 0 if card_id % 2 else None,
+        "owner": "alice" if card_id % 2 else user("bob"),
+        "order": card_id,
+        "archived": card_id % 7 == 0,
+        "duedate": None if card_id % 3 == 0 else
+        "2021-01-{:02d}T12:00:00+00:00".format(card_id % 28 + 1),
+        "deletedAt": TIMESTAMP if card_id % 11 == 0 else 0,
+        "commentsUnread": card_id % 2,
+        "id": card_id,
+        "ETag": "card-{}".format(card_id),
+        "overdue": 0,
+    }
+
+
+STACK_TITLES = ["Backlog", "In Progress", "Done"]
+
+
+def stacks(board_id: int, cards_per_stack: int) -> List[Dict[str, Any]]:
+    """The Stacks of a Board, an additional empty Stack has no cards key."""
+    rsl = []
+    for i, title in enumerate(STACK_TITLES):
+        stack_id = board_id * 10 + i
+        first = stack_id * cards_per_stack
+        rsl.append({
+            "title": title,
+            "boardId": board_id,
+            "deletedAt": 0,
+            "lastModified": TIMESTAMP,
+            "cards": [card(board_id, stack_id, first + x)
+                      for x in range(cards_per_stack)],
+            "order": i,
+            "id": stack_id,
+            "ETag": "stack-{}".format(stack_id),
+        })
+    rsl.append({
+        "title": "Empty",
+        "boardId": board_id,
+        "deletedAt": 0,
+        "lastModified": 0,
+        "order": len(STACK_TITLES),
+        "id": board_id * 10 + len(STACK_TITLES),
+        "ETag": "stack-empty",
+    })
+    return rsl
+
+
+def board(board_id: int) -> Dict[str, Any]:
+    """A Board as returned by the get-all-boards call."""
+    return {
+        "title": "Board {}".format(board_id),
+        "owner": user("alice"),
+        "color": "0082c9",
+        "archived": False,
+        "labels": [label(board_id, x) for x in range(1, 4)],
+        "acl": [],
+        "permissions": {
+            "PERMISSION_READ": True,
+            "PERMISSION_EDIT": True,
+            "PERMISSION_MANAGE": True,
+            "PERMISSION_SHARE": True,
+        },
+        "users": [user("alice"), user("bob")],
+        "stacks": [],
+        "deletedAt": 0,
+        "lastModified": TIMESTAMP + board_id,
+        "settings": {"notify-due": "off", "calendar": True},
+        "id": board_id,
+        "ETag": "board-{}".format(board_id),
+        "shared": 0,
+    }
+
+
+def boards_json(count: int) -> str:
+    """The response of the get-all-boards call."""
+    return json.dumps([board(x) for x in range(1, count + 1)])
+
+
+def stacks_json(board_id: int, cards_per_stack: int) -> str:
+    """The response of the Stacks call of a Board."""
+    return json.dumps(stacks(board_id, cards_per_stack))
@@ -0,0 +1,117 @@
+"""
+Conditional requests through the ResponseCache: entries are kept per user,
+unchanged responses are only decoded once and the least recently used
+entries are evicted first.
+"""
+import os
+
+import pytest
+
+from deck_cli.deck import fetch as fetch_module
+from deck_cli.deck.cache import ResponseCache
+from deck_cli.deck.fetch import Fetch
+
+from fake_api import FakeSession
+
+URL = "https://nc.example.com"
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Answers the requests of Fetch with synthetic payloads."""
+    rsl = FakeSession(2, 5)
+    monkeypatch.setattr(
+        Fetch, "_Fetch__new_session", lambda self, pool_size: rsl)
+    return rsl
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """Counts the decoded responses."""
+    calls = []
+
+    def decode_response(raw):
+        calls.append(raw)
+        return original(raw)
+    original = fetch_module.decode_response
+    monkeypatch.setattr(fetch_module, "decode_response", decode_response)
+    return calls
+
+
+def test_entries_per_user(tmp_path, session):
+    cache = ResponseCache(str(tmp_path))
+    alice = Fetch(URL, "alice", "secret", cache=cache)
+    bob = Fetch(URL, "bob", "secret", cache=cache)
+
+    boards = alice.all_boards()
+    assert bob.all_boards() == boards
+    assert session.not_modified == []
+    assert alice.all_boards() == boards
+    assert len(session.not_modified) == 1
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_unchanged_response_decoded_once(tmp_path, session, decoded):
+    fetch = Fetch(URL, "alice", "secret", cache=ResponseCache(str(tmp_path)))
+    stacks = fetch.stacks_by_board(1)
+    assert len(decoded) == 1
+
+    for _ in range(3):
+        assert fetch.stacks_by_board(1) == stacks
+    assert len(session.not_modified) == 3
+    assert len(decoded) == 2
+
+    restarted = Fetch(
+        URL, "alice", "secret", cache=ResponseCache(str(tmp_path)))
+    assert restarted.stacks_by_board(1) == stacks
+    assert restarted.stacks_by_board(1) == stacks
+    assert len(decoded) == 3
+
+
+def test_changed_response(tmp_path, session):
+    fetch = Fetch(URL, "alice", "secret", cache=ResponseCache(str(tmp_path)))
+    fetch.stacks_by_board(1)
+    fetch.stacks_by_board(1)
+    session.update(1)
+    stacks = fetch.stacks_by_board(1)
+    assert len(session.not_modified) == 1
+    assert stacks[0].cards[0].title.endswith(" v1")
+    assert fetch.stacks_by_board(1) == stacks
+
+
+def entry_size(cache: ResponseCache, key: str, body: str) -> int:
+    """Returns the size of the file of a single entry."""
+    cache.put(key, "etag", body)
+    size = sum(os.path.getsize(os.path.join(cache.path, x))
+               for x in os.listdir(cache.path))
+    cache.clear()
+    return size
+
+
+def cache_file(cache: ResponseCache, key: str) -> str:
+    """Returns the path of the file holding the given entry."""
+    return os.path.join(
+        cache.path, cache._ResponseCache__file_name(key))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    size = entry_size(ResponseCache(str(tmp_path)), "a", "x" * 100)
+    cache = ResponseCache(str(tmp_path), max_size=3 * size)
+    for stamp, key in enumerate(["a", "b", "c"], start=1):
+        cache.put(key, "etag", "x" * 100)
+        os.utime(cache_file(cache, key), (stamp, stamp))
+    assert cache.get("a") is not None
+    cache.put("d", "etag", "x" * 100)
+
+    assert not os.path.exists(cache_file(cache, "b"))
+    assert all(cache.get(x) is not None for x in ["a", "c", "d"])
+
+
+def test_size_in_bytes(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    body = "ä€" * 50
+    size = entry_size(cache, "a", body)
+    cache = ResponseCache(str(tmp_path), max_size=2 * size - 1)
+    cache.put("a", "etag", body)
+    cache.put("b", "etag", body)
+    assert len(os.listdir(cache.path)) == 1
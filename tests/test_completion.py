@@ -0,0 +1,90 @@
+"""
+Checks the matching and ranking of the completion index for short (prefix
+index) and long (trigram index) inputs, fuzzy matches and recent names.
+"""
+from prompt_toolkit.document import Document
+
+from deck_cli.cli.completion import CompletionIndex, RecentNames
+
+NAMES = [
+    "Backend",
+    "Frontend",
+    "Backlog",
+    "Back to school",
+    "Feedback",
+    "In Progress",
+    "Code_Review",
+]
+
+
+def test_prefix():
+    index = CompletionIndex(NAMES)
+    assert index.complete("ba") == [
+        "Backend", "Backlog", "Back to school", "Feedback"]
+    assert index.complete("BACK") == [
+        "Backend", "Backlog", "Back to school", "Feedback"]
+    assert index.complete("  backe ") == ["Backend"]
+
+
+def test_word_prefix():
+    index = CompletionIndex(NAMES)
+    assert index.complete("pr") == ["In Progress"]
+    assert index.complete("prog") == ["In Progress"]
+    assert index.complete("re")[:1] == ["Code_Review"]
+
+
+def test_substring():
+    index = CompletionIndex(NAMES)
+    assert index.complete("end") == ["Backend", "Frontend"]
+    assert index.complete("ogres") == ["In Progress"]
+
+
+def test_fuzzy_after_substring():
+    index = CompletionIndex(NAMES)
+    assert index.complete("bkl") == ["Backlog", "Back to school"]
+    assert index.complete("fnd") == ["Frontend"]
+    assert index.complete("re") == ["Code_Review", "In Progress", "Frontend"]
+    assert index.complete("xyz") == []
+
+
+def test_recent_names_first():
+    index = CompletionIndex(NAMES)
+    recent = RecentNames(["Frontend", "Unknown"])
+    assert index.complete("end", recent) == ["Frontend", "Backend"]
+    assert index.complete("", recent, limit=3) == [
+        "Frontend", "Backend", "Backlog"]
+    recent.use("Back to school")
+    assert index.complete("bl", recent) == ["Back to school", "Backlog"]
+    # Recent names don't outrank the names containing the input.
+    assert index.complete("kl", recent) == ["Backlog", "Back to school"]
+
+
+def test_limit():
+    index = CompletionIndex(NAMES)
+    assert index.complete("ba", limit=2) == ["Backend", "Backlog"]
+    assert index.complete("", limit=2) == ["Backend", "Frontend"]
+
+
+def test_contains():
+    index = CompletionIndex(NAMES)
+    assert "Backend" in index
+    assert "backend" not in index
+    assert len(index) == len(NAMES)
+
+
+def test_completions_replace_input():
+    index = CompletionIndex(NAMES)
+    rsl = list(index.completions(Document("prog")))
+    assert [x.text for x in rsl] == ["In Progress"]
+    assert rsl[0].start_position == -4
+
+
+def test_recent_names():
+    recent = RecentNames(["a", "b", "c"], size=3)
+    assert not recent.changed
+    recent.use("c")
+    recent.use("d")
+    assert recent.names == ["d", "c", "a"]
+    assert recent.rank("d") == 0
+    assert recent.rank("b") == 3
+    assert recent.changed
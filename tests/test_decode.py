@@ -0,0 +1,62 @@
+"""
+The fast decoders have to produce the same objects as the marshmallow
+schemas for every variation of the API responses.
+"""
+import json
+
+import pytest
+
+from deck_cli.deck import decode
+from deck_cli.deck.models import DeckException, NCBoard, NCDeckStack
+
+import payloads
+
+
+def test_stacks_equal_schema():
+    raw = payloads.stacks_json(1, 40)
+    fast = decode.stacks_from_json(raw)
+    assert fast == NCDeckStack.from_json(raw, True)
+    assert len(fast) == len(payloads.STACK_TITLES) + 1
+    assert fast[-1].cards is None
+
+
+def test_payload_variations_covered():
+    cards = [x for stack in decode.stacks_from_json(
+        payloads.stacks_json(1, 40)) for x in stack.cards or []]
+    assert any(x.duedate is None for x in cards)
+    assert any(x.duedate is not None for x in cards)
+    assert any(x.labels == [] for x in cards)
+    assert any(x.assigned_users == [] for x in cards)
+    assert any(x.archived for x in cards)
+    assert any(x.deleted_at is not None for x in cards)
+    assert any(isinstance(x.owner, str) for x in cards)
+    assert any(not isinstance(x.owner, str) for x in cards)
+
+
+def test_board_stacks_equal_schema():
+    data = [payloads.board(x) for x in range(1, 4)]
+    for board in data:
+        board["stacks"] = payloads.stacks(board["id"], 10)
+    boards = NCBoard.from_json(json.dumps(data), True)
+    assert [x.board_id for x in boards] == [1, 2, 3]
+    for board, raw in zip(boards, data):
+        fast = decode.stacks_from_json(json.dumps(raw["stacks"]))
+        assert fast == board.stacks
+
+
+def test_null_fields():
+    data = payloads.stacks(1, 1)
+    card = data[0]["cards"][0]
+    card.update(labels=None, assignedUsers=None, duedate=None,
+                attachmentCount=None, lastModified=0, createdAt=0)
+    raw = json.dumps(data)
+    fast = decode.stacks_from_json(raw)
+    assert fast == NCDeckStack.from_json(raw, True)
+    assert fast[0].cards[0].labels is None
+    assert fast[0].cards[0].last_modified is None
+
+
+def test_api_error():
+    raw = json.dumps({"status": 400, "message": "Permission denied"})
+    with pytest.raises(DeckException):
+        decode.stacks_from_json(raw)
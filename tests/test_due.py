@@ -0,0 +1,91 @@
+"""
+Boundaries of the due date queries, checked on the Deck and on a
+SnapshotDeck. Intervals include the start and exclude the end. Naive dates
+are interpreted in the local timezone.
+"""
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from deck_cli.deck.simplified import CardState, Deck, Stack
+
+from decks import CET, board, card, snapshot_of
+
+START = datetime(2021, 3, 1, 12, tzinfo=timezone.utc)
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture(autouse=True)
+def local_timezone(monkeypatch):
+    """Uses a local timezone other than UTC for the naive dates."""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def build() -> Deck:
+    """
+    Cards due at START (as UTC, CET and naive local time), one hour later,
+    one hour earlier (done) and without due date.
+    """
+    naive = START.astimezone().replace(tzinfo=None)
+    return Deck(users=[], boards=[board(1, "Board", [
+        Stack(1, "Backlog", [
+            card(1, CardState.BACKLOG, START),
+            card(2, CardState.BACKLOG, START.astimezone(CET)),
+            card(3, CardState.BACKLOG, naive),
+            card(4, CardState.BACKLOG, START + HOUR),
+            card(5, CardState.BACKLOG),
+        ]),
+        Stack(2, "Done", [
+            card(6, CardState.DONE, START - HOUR),
+            card(7, CardState.DONE),
+        ]),
+    ])])
+
+
+@pytest.fixture(params=["deck", "snapshot"])
+def deck(request):
+    """The test Deck, either decoded or as SnapshotDeck."""
+    if request.param == "deck":
+        return build()
+    return snapshot_of(build())
+
+
+def ids(cards) -> list:
+    """Returns the identifiers of the Cards."""
+    return [x.identifier for x in cards]
+
+
+def test_start_inclusive(deck):
+    assert ids(deck.due_cards(START, None)) == [1, 2, 3, 4]
+
+
+def test_end_exclusive(deck):
+    assert ids(deck.due_cards(None, START, include_done=True)) == [6]
+    assert ids(deck.due_cards(START, START + HOUR)) == [1, 2, 3]
+
+
+def test_empty_interval(deck):
+    assert ids(deck.due_cards(START, START)) == []
+
+
+def test_naive_limits(deck):
+    naive = START.astimezone().replace(tzinfo=None)
+    assert ids(deck.due_cards(naive, naive + HOUR)) == [1, 2, 3]
+
+
+def test_without_due_date(deck):
+    assert ids(deck.due_cards(include_done=True)) == [6, 1, 2, 3, 4]
+
+
+def test_done_excluded(deck):
+    assert ids(deck.due_cards(None, START)) == []
+    assert 6 not in ids(deck.overdue_cards())
+
+
+def test_overdue(deck):
+    assert ids(deck.overdue_cards()) == [1, 2, 3, 4]
@@ -0,0 +1,113 @@
+"""
+Checks that dumps are streamed: the Cards of a Board are released once it
+was handed over, only the Boards fetched ahead stay in memory. Incremental
+dumps only fetch the Stacks of the changed Boards.
+"""
+import gc
+
+import pytest
+
+from deck_cli.cli.config import Config
+from deck_cli.cli.fetch import deck_to_file, fetch_boards
+from deck_cli.cli.fetch import load_deck_from_file
+from deck_cli.deck.fetch import Fetch
+from deck_cli.deck.models import NCDeckCard
+from deck_cli.deck.snapshot import SnapshotDeck
+
+from fake_api import FakeSession
+import payloads
+
+BOARDS = 6
+CARDS_PER_STACK = 40
+CARDS_PER_BOARD = CARDS_PER_STACK * len(payloads.STACK_TITLES)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """Answers the requests of Fetch with synthetic payloads."""
+    session = FakeSession(BOARDS, CARDS_PER_STACK)
+    monkeypatch.setattr(
+        Fetch, "_Fetch__new_session", lambda self, pool_size: session)
+    return session
+
+
+def live_cards() -> int:
+    """Returns the number of API Cards still reachable."""
+    gc.collect()
+    return sum(1 for x in gc.get_objects() if isinstance(x, NCDeckCard))
+
+
+@pytest.mark.parametrize("workers,async_fetch,fast_decode", [
+    (1, False, False),
+    (3, False, True),
+    (3, True, False),
+])
+def test_fetch_boards_releases_cards(
+    fake_api,
+    workers: int,
+    async_fetch: bool,
+    fast_decode: bool,
+):
+    cfg = Config.defaults()
+    cfg.url = "https://nc.example.com"
+    cfg.workers = workers
+    cfg.async_fetch = async_fetch
+    cfg.fast_decode = fast_decode
+    retained = []
+    titles = []
+
+    def on_board(board):
+        titles.append(board.name)
+        retained.append(live_cards())
+
+    fetch_boards(cfg, lambda *args: None, on_board)
+
+    assert titles == ["Board {}".format(x) for x in range(1, BOARDS + 1)]
+    assert max(retained) <= workers * CARDS_PER_BOARD
+    assert live_cards() == 0
+
+
+def load(path: str):
+    """Loads a dump as decoded Deck."""
+    with open(path, "rb") as fil:
+        deck = load_deck_from_file(fil)
+    if isinstance(deck, SnapshotDeck):
+        return deck.deck()
+    return deck
+
+
+@pytest.mark.parametrize("fmt", ["yaml", "snapshot"])
+@pytest.mark.parametrize("async_fetch", [False, True])
+def test_incremental_dump(
+    tmp_path,
+    monkeypatch,
+    fmt: str,
+    async_fetch: bool,
+):
+    fake_api = FakeSession(3, 2)
+    monkeypatch.setattr(
+        Fetch, "_Fetch__new_session", lambda self, pool_size: fake_api)
+    cfg = Config.defaults()
+    cfg.url = "https://nc.example.com"
+    cfg.async_fetch = async_fetch
+    path = str(tmp_path / "dump")
+    deck_to_file(cfg, path, lambda *args: None, fmt=fmt)
+    previous = load(path)
+    assert sorted(fake_api.stacks_requests()) == [1, 2, 3]
+
+    fake_api.requests.clear()
+    deck_to_file(cfg, path, lambda *args: None, incremental=True, fmt=fmt)
+    assert fake_api.stacks_requests() == []
+    assert load(path) == previous
+
+    fake_api.update(2)
+    deck_to_file(cfg, path, lambda *args: None, incremental=True, fmt=fmt)
+    assert fake_api.stacks_requests() == [2]
+    merged = load(path)
+    full_path = str(tmp_path / "full")
+    deck_to_file(cfg, full_path, lambda *args: None, fmt=fmt)
+    assert merged == load(full_path)
+    assert merged.boards[0] == previous.boards[0]
+    assert merged.boards[1] != previous.boards[1]
+    assert all(x.name.endswith(" v1") for x in merged.boards[1].cards())
+    assert [x.name for x in merged.boards] == [x.name for x in previous.boards]
@@ -0,0 +1,135 @@
+"""
+The filter language: CardFilter.apply has to return the same Cards as
+checking every Card, for the Deck and for a SnapshotDeck. Invalid
+expressions raise a FilterException.
+"""
+from datetime import timedelta
+
+import pytest
+import pytz
+
+from deck_cli.deck.filter import CardFilter, FilterException
+from deck_cli.deck.simplified import CardState, Deck, Stack
+
+from decks import ALICE, BOB, NOW, board, card, sample_deck, snapshot_of
+
+TZ = pytz.timezone("Europe/Berlin")
+STATES = [CardState.BACKLOG, CardState.IN_PROGRESS, CardState.DONE, None]
+EXPRESSIONS = [
+    "",
+    "board:Backend",
+    "board:Backend,Frontend",
+    "-board:Backend",
+    "stack:Backlog",
+    "state:backlog,progress",
+    "state:none",
+    "-state:done",
+    "label:bug",
+    "label:bug,docs -label:docs",
+    "assignee:alice",
+    "user:bob",
+    "assignee:alice,bob state:backlog",
+    "-assignee:alice",
+    "archived:yes",
+    "archived:no assignee:bob",
+    "due:any",
+    "due:none",
+    "due:overdue",
+    "due:..+7d",
+    "due:-1d..",
+    "due:today..+2w state:progress",
+    "-due:overdue board:Frontend",
+    "card",
+    "text:card",
+    '"Card 1"',
+    '"text:Card 1"',
+    '"unknown:word"',
+    "-text:card",
+    "ünïcode",
+    "board:Backend label:bug assignee:alice due:..now",
+]
+
+
+def large_deck() -> Deck:
+    """A Deck with enough Cards for the index to be more selective."""
+    boards = []
+    for board_id in range(1, 4):
+        stacks = []
+        for stack_id, state in enumerate(STATES):
+            cards = []
+            for i in range(10):
+                number = board_id * 100 + stack_id * 10 + i
+                cards.append(card(
+                    number, state,
+                    None if i % 3 == 0 else NOW + timedelta(days=i - 5),
+                    [ALICE] if i % 2 else [BOB] if i % 5 else [],
+                    ["bug"] if i % 4 == 0 else ["docs"] if i == 3 else [],
+                    archived=i == 7))
+            stacks.append(Stack(board_id * 10 + stack_id,
+                                ["Backlog", "In Progress", "Done",
+                                 "Ideas"][stack_id], cards))
+        boards.append(board(
+            board_id, ["Backend", "Frontend", "Ops"][board_id - 1], stacks))
+    return Deck(users=[], boards=boards)
+
+
+@pytest.fixture(params=[
+    ("sample", False), ("sample", True), ("large", False), ("large", True)])
+def deck(request):
+    """A Deck, either decoded or as SnapshotDeck."""
+    name, snapshot = request.param
+    rsl = sample_deck() if name == "sample" else large_deck()
+    return snapshot_of(rsl) if snapshot else rsl
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_apply_equals_scan(deck, expression):
+    card_filter = CardFilter.parse(expression, TZ, now=NOW)
+    expected = [x for x in deck.cards() if card_filter.matches(x)]
+    assert card_filter.apply(deck) == expected
+
+
+def ids(expression: str) -> list:
+    """The identifiers of the Cards of the sample Deck matching."""
+    card_filter = CardFilter.parse(expression, TZ, now=NOW)
+    return [x.identifier for x in card_filter.apply(sample_deck())]
+
+
+def test_terms():
+    assert ids("board:Frontend") == [7, 8]
+    assert ids("-board:Backend") == [7, 8]
+    assert ids("assignee:alice") == [1, 2, 6]
+    assert ids("label:bug -label:docs") == [1]
+    assert ids("state:none") == [7, 8]
+    assert ids("archived:yes") == [5]
+    assert ids("due:none") == [3, 8]
+    assert ids("due:overdue -state:done") == [1, 5]
+    assert ids("due:..+1d") == [1, 4, 5, 6]
+    assert ids('"description" "card 8"') == []
+    assert ids("ünïcode") == [8]
+
+
+def test_quoted_terms():
+    assert ids('"text:Card 2"') == [2]
+    assert ids("'board:Backend' state:done") == [6]
+    assert ids('"asignee:alice"') == []
+    assert ids('-"asignee:alice"') == list(range(1, 9))
+    assert ids("10:30") == []
+
+
+@pytest.mark.parametrize("expression,message", [
+    ("asignee:alice", "unknown key asignee"),
+    ("bogus:x", "unknown key bogus"),
+    ("-bogus:x", "unknown key bogus"),
+    ("board:", "missing value for board"),
+    ("state:started", "invalid value started for state"),
+    ("archived:yes,no", "archived takes a single value"),
+    ("archived:maybe", "invalid value maybe for archived"),
+    ("due:tomorrow", "due takes an interval"),
+    ("due:2021-13-01..", "invalid date 2021-13-01"),
+    ("due:..+7x", "invalid date"),
+    ('"unterminated', "No closing quotation"),
+])
+def test_invalid(expression, message):
+    with pytest.raises(FilterException, match=message):
+        CardFilter.parse(expression, TZ, now=NOW)
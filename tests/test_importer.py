@@ -0,0 +1,187 @@
+"""
+Checks the import against a stand-in for the Deck API: the rows are resolved
+before anything is created and an interrupted import is resumed from its
+journal.
+"""
+from types import SimpleNamespace
+from typing import List, Optional, Set
+
+import pytest
+import requests
+
+from deck_cli.cli.config import Config
+from deck_cli.cli.importer import ImportCard, ImportException, Importer
+from deck_cli.cli.importer import ImportJournal
+from deck_cli.deck.fetch import Fetch
+from deck_cli.deck.models import DeckException, NCBoard, NCDeckStack
+
+import payloads
+
+USERS = ["alice", "bob", "carol"]
+
+
+class FakeDeck:
+    """
+    Replaces the requests of Fetch used by the import. Cards and assignments
+    listed in fail_cards and fail_users fail with a connection error, Users
+    in outsiders aren't part of the Boards.
+    """
+    boards: List[dict]
+    fail_cards: Set[str]
+    fail_users: Set[str]
+    fail_stacks: bool
+    outsiders: Set[str]
+    created: List[str]
+    assigned: List[tuple]
+
+    def __init__(self, boards: Optional[List[dict]] = None):
+        self.boards = boards or [payloads.board(1), payloads.board(2)]
+        self.fail_cards = set()
+        self.fail_users = set()
+        self.fail_stacks = False
+        self.outsiders = set()
+        self.created = []
+        self.assigned = []
+
+    def install(self, monkeypatch):
+        """Routes the calls of all Fetch instances to this Deck."""
+        monkeypatch.setattr(Fetch, "all_boards", lambda _: self.all_boards())
+        monkeypatch.setattr(
+            Fetch, "stacks_by_board", lambda _, x: self.stacks_by_board(x))
+        monkeypatch.setattr(Fetch, "user_ids", lambda _: list(USERS))
+        monkeypatch.setattr(
+            Fetch, "add_card", lambda _, *args: self.add_card(*args))
+        monkeypatch.setattr(
+            Fetch, "assign_user_to_card",
+            lambda _, *args: self.assign_user_to_card(*args))
+
+    def all_boards(self) -> List[NCBoard]:
+        return NCBoard.from_data(self.boards, True)
+
+    def stacks_by_board(self, board_id: int) -> List[NCDeckStack]:
+        if self.fail_stacks:
+            raise requests.ConnectionError("connection refused")
+        return NCDeckStack.from_data(payloads.stacks(board_id, 1), True)
+
+    def add_card(self, board_id: int, stack_id: int, post) -> SimpleNamespace:
+        if post.title in self.fail_cards:
+            raise requests.ConnectionError("connection reset")
+        self.created.append(post.title)
+        return SimpleNamespace(card_id=1000 + len(self.created))
+
+    def assign_user_to_card(
+        self,
+        board_id: int,
+        stack_id: int,
+        card_id: int,
+        user: str,
+    ):
+        if user in self.fail_users:
+            raise requests.ConnectionError("connection reset")
+        if user in self.outsiders:
+            raise DeckException(
+                {"message": "The user is not part of the board"})
+        self.assigned.append((card_id, user))
+
+
+@pytest.fixture
+def deck(monkeypatch) -> FakeDeck:
+    rsl = FakeDeck()
+    rsl.install(monkeypatch)
+    return rsl
+
+
+def config() -> Config:
+    rsl = Config.defaults()
+    rsl.workers = 2
+    return rsl
+
+
+def run_import(cards: List[ImportCard], journal: str) -> dict:
+    """Runs a complete import and returns the status of each title."""
+    importer = Importer(config(), cards, ImportJournal(journal))
+    try:
+        results = importer.run(importer.prepare(), lambda _: None)
+    finally:
+        importer.close()
+    return {x.title: x.status for x in results}
+
+
+CARDS = [
+    ImportCard(title="First", board="Board 1", users=["alice"]),
+    ImportCard(title="Second", board="Board 2", stack="Done"),
+    ImportCard(title="Third", board="Board 1", users=["bob", "carol"]),
+    ImportCard(title="Fourth", board="Board 2", users=["carol"]),
+]
+
+
+def test_resume_interrupted_import(deck, tmp_path):
+    journal = str(tmp_path / "cards.journal")
+    deck.fail_cards = {"Second"}
+    deck.fail_users = {"carol"}
+    deck.outsiders = {"bob"}
+    assert run_import(CARDS, journal) == {
+        "First": "created",
+        "Second": "failed",
+        "Third": "failed",
+        "Fourth": "failed",
+    }
+    assert sorted(deck.created) == ["First", "Fourth", "Third"]
+
+    deck.fail_cards = set()
+    deck.fail_users = set()
+    deck.created = []
+    deck.assigned = []
+    assert run_import(CARDS, journal) == {
+        "First": "skipped",
+        "Second": "created",
+        "Third": "resumed",
+        "Fourth": "resumed",
+    }
+    # Only the failed Card is created again, the User which isn't part of
+    # the Board isn't retried.
+    assert deck.created == ["Second"]
+    assert sorted(x[1] for x in deck.assigned) == ["carol", "carol"]
+
+    assert run_import(CARDS, journal) == {
+        x.title: "skipped" for x in CARDS}
+
+
+def test_journal_of_other_file(deck, tmp_path):
+    journal = str(tmp_path / "cards.journal")
+    run_import(CARDS[:1], journal)
+    with pytest.raises(ImportException, match="belongs to another file"):
+        run_import([ImportCard(title="Other", board="Board 1")], journal)
+
+
+def test_invalid_rows_create_nothing(deck, tmp_path):
+    cards = [
+        ImportCard(title="Valid", board="Board 1"),
+        ImportCard(title="Board", board="Board 9"),
+        ImportCard(title="Stack", board="Board 1", stack="Nowhere"),
+        ImportCard(title="User", board="Board 1", users=["mallory"]),
+        ImportCard(title="Date", board="Board 1", duedate="tomorrow"),
+    ]
+    with pytest.raises(ImportException) as exc:
+        run_import(cards, str(tmp_path / "cards.journal"))
+    assert [x.split(":")[0] for x in exc.value.errors] == [
+        "row 2 (Board)", "row 3 (Stack)", "row 4 (User)", "row 5 (Date)"]
+    assert deck.created == []
+
+
+def test_duplicate_board_titles(monkeypatch, tmp_path):
+    twin = payloads.board(3)
+    twin["title"] = "Board 1"
+    deck = FakeDeck([payloads.board(1), payloads.board(2), twin])
+    deck.install(monkeypatch)
+    with pytest.raises(ImportException, match=r"several Boards \(ids 1, 3\)"):
+        run_import(CARDS, str(tmp_path / "cards.journal"))
+    # Rows of other Boards aren't affected by the ambiguous title.
+    assert run_import(CARDS[1:2], str(tmp_path / "other.journal")) == {
+        "Second": "created"}
+
+
+def test_stacks_not_fetched(deck, tmp_path):
+    deck.fail_stacks = True
+    with pytest.raises(ImportException, match="couldn't fetch the Boards"):
+        run_import(CARDS, str(tmp_path / "cards.journal"))
@@ -0,0 +1,9 @@
+"""
+Smoke test of the CLI: all modules have to be importable, annotations are
+evaluated at import time.
+"""
+
+
+def test_import_cli():
+    import deck_cli.cli.main
+    assert deck_cli.cli.main.cli.commands
@@ -0,0 +1,74 @@
+"""
+Checks the persistent metadata cache: round trips, the scope of an entry
+(instance and user), the TTL and the invalidation.
+"""
+import time
+
+import pytest
+
+from deck_cli.cli.metadata import BoardEntry, Metadata, MetadataCache
+from deck_cli.cli.metadata import StackEntry
+
+URL = "https://cloud.example.com"
+
+
+def metadata(fetched_at: float, user: str = "alice") -> Metadata:
+    return Metadata(
+        url=URL,
+        user=user,
+        fetched_at=fetched_at,
+        boards=[BoardEntry(1, "Backend"), BoardEntry(2, "Frontend")],
+        users=["alice", "bob"],
+        stacks={
+            1: [StackEntry(10, "Backlog"), StackEntry(11, "Done")],
+            2: [StackEntry(20, "Backlog")],
+        },
+        recent_boards=["Frontend"],
+        recent_users=["bob"],
+    )
+
+
+@pytest.fixture
+def cache(tmp_path) -> MetadataCache:
+    return MetadataCache(str(tmp_path / "cache" / "metadata.json"), ttl=60)
+
+
+def test_round_trip(cache):
+    data = metadata(time.time())
+    cache.save(data)
+    assert cache.load(URL, "alice") == data
+
+
+def test_missing_or_unreadable(cache):
+    assert cache.load(URL, "alice") is None
+    cache.save(metadata(time.time()))
+    with open(cache.path, "w") as fil:
+        fil.write("{\"url\": ")
+    assert cache.load(URL, "alice") is None
+
+
+def test_other_instance_or_user(cache):
+    cache.save(metadata(time.time()))
+    assert cache.load("https://other.example.com", "alice") is None
+    assert cache.load(URL, "bob") is None
+    cache.save(metadata(time.time(), user="bob"))
+    assert cache.load(URL, "alice") is None
+    assert cache.load(URL, "bob").user == "bob"
+
+
+def test_expiry(cache):
+    fresh = metadata(time.time() - 30)
+    stale = metadata(time.time() - 90)
+    assert not cache.is_stale(fresh)
+    assert cache.is_stale(stale)
+    # Stale metadata is still returned, it's refreshed by the caller.
+    cache.save(stale)
+    assert cache.is_stale(cache.load(URL, "alice"))
+
+
+def test_clear(cache):
+    assert not cache.clear()
+    cache.save(metadata(time.time()))
+    assert cache.clear()
+    assert cache.load(URL, "alice") is None
+    assert not cache.clear()
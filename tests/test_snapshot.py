@@ -0,0 +1,94 @@
+"""
+Round trip of Decks through the binary snapshot format and the errors
+raised for snapshots which can't be read.
+"""
+import struct
+
+import click
+import pytest
+
+from deck_cli.cli.config import Config
+from deck_cli.cli.fetch import deck_to_file, load_deck_from_file
+from deck_cli.deck.fetch import Fetch
+from deck_cli.deck.snapshot import MAGIC, VERSION, SnapshotDeck
+from deck_cli.deck.snapshot import SnapshotException
+
+from decks import empty_deck, sample_deck, snapshot_bytes, snapshot_of
+from fake_api import FakeSession
+
+
+def assert_same_deck(actual, expected):
+    """Compares two Decks including the kind (naive, aware) of the dates."""
+    assert actual == expected
+    assert [(x.username, x.full_name) for x in actual.users] == \
+        [(x.username, x.full_name) for x in expected.users]
+    for got, want in zip(actual.cards(), expected.cards()):
+        if want.duedate is not None:
+            assert got.duedate.utcoffset() == want.duedate.utcoffset()
+    for got, want in zip(actual.boards, expected.boards):
+        assert got.last_modified == want.last_modified
+        assert got.etag == want.etag
+
+
+@pytest.mark.parametrize("build", [sample_deck, empty_deck])
+def test_round_trip(build):
+    deck = build()
+    assert_same_deck(snapshot_of(deck).deck(), build())
+
+
+def test_sample_deck_covered():
+    deck = snapshot_of(sample_deck()).deck()
+    dates = [x.duedate for x in deck.cards() if x.duedate is not None]
+    assert any(x.tzinfo is None for x in dates)
+    assert any(x.tzinfo is not None for x in dates)
+    assert any(x.description is None for x in deck.cards())
+    assert any(not x.cards for board in deck.boards for x in board.stacks)
+    assert "carol" in [x.username for x in deck.users]
+    assert deck.user_cards("carol") == []
+
+
+def test_dump_round_trip(tmp_path, monkeypatch):
+    session = FakeSession(3, 4)
+    monkeypatch.setattr(
+        Fetch, "_Fetch__new_session", lambda self, pool_size: session)
+    cfg = Config.defaults()
+    cfg.url = "https://nc.example.com"
+    decks = []
+    for fmt in ["yaml", "snapshot"]:
+        path = str(tmp_path / "dump.{}".format(fmt))
+        deck_to_file(cfg, path, lambda *args: None, fmt=fmt)
+        with open(path, "rb") as fil:
+            decks.append(load_deck_from_file(fil))
+    yaml_deck, snapshot = decks
+    assert isinstance(snapshot, SnapshotDeck)
+    assert len(yaml_deck.cards()) == 3 * 4 * 3
+    assert_same_deck(snapshot.deck(), yaml_deck)
+
+
+def test_wrong_version():
+    data = bytearray(snapshot_bytes(sample_deck()))
+    struct.pack_into("<H", data, len(MAGIC), VERSION + 1)
+    with pytest.raises(SnapshotException, match="version"):
+        SnapshotDeck(bytes(data))
+
+
+@pytest.mark.parametrize("length", [len(MAGIC), 12, 100, -1, -20])
+def test_truncated(length):
+    data = snapshot_bytes(sample_deck())[:length]
+    with pytest.raises(SnapshotException):
+        SnapshotDeck(data)
+
+
+def test_corrupt_footer():
+    data = bytearray(snapshot_bytes(sample_deck()))
+    struct.pack_into("<Q", data, len(data) - 16, len(data) - 20)
+    with pytest.raises(SnapshotException):
+        SnapshotDeck(bytes(data))
+
+
+def test_load_reports_click_exception(tmp_path):
+    path = tmp_path / "dump.snapshot"
+    path.write_bytes(snapshot_bytes(sample_deck())[:-1])
+    with open(str(path), "rb") as fil:
+        with pytest.raises(click.ClickException, match="dump.snapshot"):
+            load_deck_from_file(fil)
@@ -0,0 +1,69 @@
+"""
+The lazy accessors of a SnapshotDeck have to return the same Cards as the
+same query on the fully decoded Deck.
+"""
+from datetime import timedelta
+
+import pytest
+
+from decks import NOW, empty_deck, sample_deck, snapshot_of
+
+INTERVALS = [
+    (None, None),
+    (None, NOW),
+    (NOW, None),
+    (NOW - timedelta(days=1), NOW + timedelta(days=3)),
+    (NOW + timedelta(days=365), None),
+]
+
+
+@pytest.fixture(params=[sample_deck, empty_deck])
+def decks(request):
+    """The Deck and the same Deck read lazily from a snapshot."""
+    return request.param(), snapshot_of(request.param())
+
+
+def test_users(decks):
+    deck, snapshot = decks
+    assert snapshot.users == deck.users
+
+
+def test_boards(decks):
+    deck, snapshot = decks
+    assert snapshot.boards == deck.boards
+
+
+def test_cards(decks):
+    deck, snapshot = decks
+    assert snapshot.cards() == deck.cards()
+
+
+def test_user_cards(decks):
+    deck, snapshot = decks
+    for username in ["alice", "bob", "carol", "unknown"]:
+        assert snapshot.user_cards(username) == deck.user_cards(username)
+
+
+def test_user_without_cards():
+    snapshot = snapshot_of(sample_deck())
+    assert "carol" in [x.username for x in snapshot.users]
+    assert snapshot.user_cards("carol") == []
+
+
+def test_overdue_cards(decks):
+    deck, snapshot = decks
+    assert snapshot.overdue_cards() == deck.overdue_cards()
+
+
+@pytest.mark.parametrize("start,end", INTERVALS)
+@pytest.mark.parametrize("include_done", [False, True])
+def test_due_cards(decks, start, end, include_done):
+    deck, snapshot = decks
+    assert snapshot.due_cards(start, end, include_done) == \
+        deck.due_cards(start, end, include_done)
+
+
+def test_lazy_access_without_decoding():
+    snapshot = snapshot_of(sample_deck())
+    assert [x.identifier for x in snapshot.user_cards("alice")] == [1, 2, 6]
+    assert snapshot._SnapshotDeck__decoded is None